@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+from settings import *
+
+class AssetCache:
+    """Process-wide store of loaded images, keyed by normalised path.
+
+    Every caller asking for the same file gets the same converted Surface, so
+    the surfaces must be treated as read-only. Needs an active display mode,
+    because images are converted on load.
+    """
+    def __init__(self):
+        self.images = {}
+        self.folders = {}
+        self.hits = 0
+        self.misses = 0
+
+    def image(self, path, alpha = True):
+        key = (os.path.normpath(path), alpha)
+        surf = self.images.get(key)
+        if surf is not None:
+            self.hits += 1
+            return surf
+
+        self.misses += 1
+        surf = pygame.image.load(path)
+        surf = surf.convert_alpha() if alpha else surf.convert()
+        self.images[key] = surf
+        return surf
+
+    def folder(self, path):
+        """Return the images in a folder, in directory listing order."""
+        return [self.image(full_path) for full_path in self.folder_paths(path)]
+
+    def folder_paths(self, path):
+        key = os.path.normpath(path)
+        paths = self.folders.get(key)
+        if paths is None:
+            paths = [os.path.join(path, filename) for filename in os.listdir(path)
+                     if filename.endswith(('.png', '.jpg', '.jpeg'))]
+            self.folders[key] = paths
+        return paths
+
+    def preload(self, images, workers = ASSET_LOAD_WORKERS):
+        """Load many (path, alpha) images at once, skipping the ones already cached.
+
+        Files are read and decoded on a thread pool; pygame releases the GIL while
+        decoding, so with several cores they can decode in parallel. Only the
+        conversion, which needs the display, runs on the calling thread.
+        """
+        todo = {}
+        for path, alpha in images:
+            key = (os.path.normpath(path), alpha)
+            if key not in self.images:
+                todo.setdefault(key, path)
+        with ThreadPoolExecutor(max_workers = workers, thread_name_prefix = 'asset-load') as executor:
+            for key, surf in zip(todo, executor.map(pygame.image.load, todo.values())):
+                self.misses += 1
+                self.images[key] = surf.convert_alpha() if key[1] else surf.convert()
+
+    def add_atlas(self, index, directory):
+        """Serve the frames listed in an atlas index as subsurfaces of its sheets.
+
+        index comes from atlas.build_atlas(); its sheets are looked up in directory.
+        """
+        sheets = [self.image(os.path.join(directory, sheet)) for sheet in index['sheets']]
+        for path, frame in index['frames'].items():
+            self.images[(os.path.normpath(path), True)] = sheets[frame['sheet']].subsurface(frame['rect'])
+        for folder, filenames in index['folders'].items():
+            self.folders[os.path.normpath(folder)] = [os.path.join(folder, filename) for filename in filenames]
+
+    def evict(self, path = None):
+        """Drop cached images under path (a file or folder), or everything if path is None."""
+        if path is None:
+            self.images.clear()
+            self.folders.clear()
+            return
+
+        prefix = os.path.normpath(path)
+        for key in [key for key in self.images if key[0] == prefix or key[0].startswith(prefix + os.sep)]:
+            del self.images[key]
+        for key in [key for key in self.folders if key == prefix or key.startswith(prefix + os.sep)]:
+            del self.folders[key]
+
+    def memory_usage(self):
+        """Approximate bytes held by the cached pixel data."""
+        # Atlas frames share their sheet's pixels
+        return sum(surf.get_pitch() * surf.get_height() for surf in self.images.values() if surf.get_parent() is None)
+
+    def stats(self):
+        return {
+            'images': len(self.images),
+            'bytes': self.memory_usage(),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+assets = AssetCache()
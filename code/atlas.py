@@ -0,0 +1,131 @@
+"""Pack the character and monster animation frames into a few atlas sheets.
+
+Each frame folder under ATLAS_FOLDERS is packed into ATLAS_SHEET_SIZE sheets
+next to a JSON index of where every frame went. load_atlas() hands the index
+to the asset cache, so import_folder() and assets.image() return subsurfaces
+of the sheets instead of opening and decoding every frame. The atlas is
+rebuilt on load when a frame was added, removed or changed; to build it ahead
+of time, run from the project root:  python code/atlas.py
+
+Sheets are written as uncompressed 32-bit BMP, which loads several times
+faster than the same pixels as PNG and keeps the alpha channel exact.
+"""
+import json
+import os
+import pygame
+from settings import *
+from asset_cache import assets
+
+# Bump when the index layout changes so stale atlases are rebuilt
+FORMAT_VERSION = 1
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def frame_folders(roots):
+    """{folder: [filenames]} for every folder under roots holding images, in directory listing order."""
+    folders = {}
+    for root in roots:
+        for folder, _, filenames in sorted(os.walk(root)):
+            # Same filter and order as AssetCache.folder
+            frames = [filename for filename in os.listdir(folder) if filename.endswith(IMAGE_EXTENSIONS)]
+            if frames:
+                folders[os.path.normpath(folder)] = frames
+    return folders
+
+
+def source_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def pack(sizes, sheet_size, padding = 1):
+    """Shelf-pack (width, height) sizes, tallest first; returns (sheet, x, y) per size."""
+    placements = [None] * len(sizes)
+    sheet, x, y, shelf_height = 0, 0, 0, 0
+    for index in sorted(range(len(sizes)), key = lambda index: (-sizes[index][1], -sizes[index][0])):
+        width, height = sizes[index]
+        if width > sheet_size or height > sheet_size:
+            raise ValueError(f'a {width}x{height} frame does not fit on a {sheet_size}px sheet')
+        if x + width > sheet_size:
+            x, y, shelf_height = 0, y + shelf_height + padding, 0
+        if y + height > sheet_size:
+            sheet, x, y, shelf_height = sheet + 1, 0, 0, 0
+        placements[index] = (sheet, x, y)
+        x += width + padding
+        shelf_height = max(shelf_height, height)
+    return placements
+
+
+def build_atlas(roots = ATLAS_FOLDERS, index_path = ATLAS_INDEX, sheet_size = ATLAS_SHEET_SIZE):
+    """Pack every frame under roots into sheets beside index_path and write the index."""
+    folders = frame_folders(roots)
+    paths = [os.path.join(folder, filename) for folder, filenames in folders.items() for filename in filenames]
+    images = [pygame.image.load(path) for path in paths]
+    placements = pack([image.get_size() for image in images], sheet_size)
+
+    sheet_count = max((placement[0] for placement in placements), default = -1) + 1
+    extents = [[0, 0] for _ in range(sheet_count)]
+    for image, (sheet, x, y) in zip(images, placements):
+        extents[sheet][0] = max(extents[sheet][0], x + image.get_width())
+        extents[sheet][1] = max(extents[sheet][1], y + image.get_height())
+    sheets = [pygame.Surface(extent, pygame.SRCALPHA) for extent in extents]
+    for image, (sheet, x, y) in zip(images, placements):
+        sheets[sheet].blit(image, (x, y))
+
+    directory = os.path.dirname(index_path)
+    os.makedirs(directory, exist_ok = True)
+    name = os.path.splitext(os.path.basename(index_path))[0]
+    sheet_names = [f'{name}_{sheet}.bmp' for sheet in range(sheet_count)]
+    for surface, sheet_name in zip(sheets, sheet_names):
+        pygame.image.save(surface, os.path.join(directory, sheet_name))
+
+    index = {
+        'version': FORMAT_VERSION,
+        'sheets': sheet_names,
+        'folders': folders,
+        'frames': {
+            path: {'sheet': sheet, 'rect': [x, y, image.get_width(), image.get_height()], 'source': source_stamp(path)}
+            for path, image, (sheet, x, y) in zip(paths, images, placements)
+        },
+    }
+    with open(index_path, 'w') as index_file:
+        json.dump(index, index_file, indent = 1)
+    return index
+
+
+def atlas_is_current(index, roots = ATLAS_FOLDERS):
+    """True when the index covers exactly the frames under roots, unchanged since it was built."""
+    if index.get('version') != FORMAT_VERSION or index['folders'] != frame_folders(roots):
+        return False
+    return all(source_stamp(path) == frame['source'] for path, frame in index['frames'].items())
+
+
+def atlas_sheets(index_path = ATLAS_INDEX):
+    """Paths of the sheets the current index points to, for preloading; empty before the first build."""
+    if not os.path.exists(index_path):
+        return []
+    with open(index_path) as index_file:
+        sheets = json.load(index_file).get('sheets', [])
+    return [os.path.join(os.path.dirname(index_path), sheet) for sheet in sheets]
+
+
+def load_atlas(roots = ATLAS_FOLDERS, index_path = ATLAS_INDEX):
+    """Register the atlas with the asset cache, rebuilding it first if it is missing or stale."""
+    index = None
+    if os.path.exists(index_path):
+        with open(index_path) as index_file:
+            index = json.load(index_file)
+        sheets_exist = all(os.path.exists(os.path.join(os.path.dirname(index_path), sheet)) for sheet in index.get('sheets', []))
+        if not (sheets_exist and atlas_is_current(index, roots)):
+            index = None
+    if index is None:
+        index = build_atlas(roots, index_path)
+        # Sheets preloaded from the stale atlas were overwritten
+        assets.evict(os.path.dirname(index_path))
+    assets.add_atlas(index, os.path.dirname(index_path))
+    return index
+
+
+if __name__ == '__main__':
+    index = build_atlas()
+    print(f'Packed {len(index["frames"])} frames into {len(index["sheets"])} sheets next to {ATLAS_INDEX}')
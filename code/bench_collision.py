@@ -0,0 +1,90 @@
+"""Time Entity.collision against a linear obstacle scan, the spatial hash and the tile store.
+
+That both give the same results is tested in tests/test_collision.py. Run
+from the project root:  python code/bench_collision.py
+"""
+import random
+import time
+import pygame
+from settings import *
+from entity import Entity
+from spatial_hash import ObstacleGroup
+from static_tiles import StaticTiles
+
+MAP_SIZES = [32, 64, 128, 256]
+ENTITY_COUNT = 50
+STEPS = 100
+OBSTACLE_DENSITY = 0.2
+
+
+class LinearObstacleGroup(pygame.sprite.Group):
+    """The old behaviour: every obstacle is a collision candidate."""
+    def nearby(self, rect, margin = TILESIZE):
+        return self.sprites()
+
+    def nearby_hitboxes(self, rect, margin = TILESIZE):
+        return [sprite.hitbox for sprite in self.sprites()]
+
+
+class Obstacle(pygame.sprite.Sprite):
+    def __init__(self, pos, groups):
+        super().__init__(groups)
+        self.rect = pygame.Rect(pos, (TILESIZE, TILESIZE))
+        self.hitbox = self.rect.copy()
+
+
+class Walker(Entity):
+    def __init__(self, pos, obstacle_sprites):
+        super().__init__([])
+        self.rect = pygame.Rect(pos, (TILESIZE, TILESIZE))
+        self.hitbox = self.rect.inflate(0, -10)
+        self.obstacle_sprites = obstacle_sprites
+
+
+def build_world(map_size, group_class, seed, use_store = False):
+    """Obstacles in group_class, as sprites or, with use_store, as stored tiles, and walkers among them."""
+    rng = random.Random(seed)
+    store = StaticTiles() if use_store else None
+    obstacles = group_class(tiles = store) if use_store else group_class()
+    free_cells = []
+    for row in range(map_size):
+        for col in range(map_size):
+            if rng.random() < OBSTACLE_DENSITY:
+                if use_store:
+                    store.add((col * TILESIZE, row * TILESIZE), [obstacles], 'invisible', size = (TILESIZE, TILESIZE))
+                else:
+                    Obstacle((col * TILESIZE, row * TILESIZE), [obstacles])
+            else:
+                free_cells.append((col * TILESIZE, row * TILESIZE))
+
+    walkers = []
+    for pos in rng.sample(free_cells, ENTITY_COUNT):
+        walker = Walker(pos, obstacles)
+        walker.direction = pygame.math.Vector2(rng.uniform(-1, 1), rng.uniform(-1, 1))
+        walkers.append(walker)
+    return obstacles, walkers
+
+
+def run(map_size, group_class, seed = 1, use_store = False):
+    obstacles, walkers = build_world(map_size, group_class, seed, use_store)
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        for walker in walkers:
+            walker.move(3)
+    elapsed = time.perf_counter() - start
+    return elapsed, len(obstacles) + (obstacles.tile_count() if use_store else 0)
+
+
+def main():
+    print(f'{ENTITY_COUNT} entities, {STEPS} steps each')
+    print(f'{"map":>9} {"obstacles":>10} {"linear ms":>10} {"hashed ms":>10} {"tiles ms":>9} {"speedup":>8}')
+    for map_size in MAP_SIZES:
+        linear_time, count = run(map_size, LinearObstacleGroup)
+        hashed_time, _ = run(map_size, ObstacleGroup)
+        tiles_time, _ = run(map_size, ObstacleGroup, use_store = True)
+        print(f'{map_size:>4}x{map_size:<4} {count:>10} {linear_time * 1000:>10.1f} '
+              f'{hashed_time * 1000:>10.1f} {tiles_time * 1000:>9.1f} {linear_time / hashed_time:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
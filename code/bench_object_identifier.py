@@ -0,0 +1,78 @@
+"""Time the per-cell 2x2 object scan against ObjectIdentifier.find_objects.
+
+Layouts are random, with objects dropped close enough to overlap, plus the
+shipped object layer; that both find the same objects is tested in
+tests/test_object_identifier.py. Run from the project root:
+python code/bench_object_identifier.py
+"""
+import random
+import time
+import numpy as np
+from map_compiler import MAP_LAYERS
+from object_identifier import ObjectIdentifier
+from support import import_csv_array
+
+MAP_SIZES = [64, 128, 256, 512]
+OBJECT_DENSITY = 0.03
+REPEATS = 3
+
+
+def random_layout(map_size, identifier, seed):
+    rng = random.Random(seed)
+    layout = np.full((map_size, map_size), -1, dtype = np.int32)
+    patterns = list(identifier.multi_tile_objects)
+    for _ in range(int(map_size * map_size * OBJECT_DENSITY)):
+        row, col = rng.randrange(map_size), rng.randrange(map_size)
+        top_left, top_right, bottom_left, bottom_right = rng.choice(patterns)
+        # Objects past the edge are cut off, like a map drawn up to its border
+        layout[row, col] = top_left
+        if col + 1 < map_size:
+            layout[row, col + 1] = top_right
+        if row + 1 < map_size:
+            layout[row + 1, col] = bottom_left
+            if col + 1 < map_size:
+                layout[row + 1, col + 1] = bottom_right
+    return layout
+
+
+def scan_cells(identifier, layout):
+    """The per-cell scan, as a map loader would run it over string cells."""
+    identifier.reset()
+    found = []
+    for row in range(len(layout)):
+        for col in range(len(layout[row])):
+            object_index, positions = identifier.get_object_at_position(layout, row, col)
+            if object_index is not None:
+                identifier.mark_positions_processed(positions)
+                found.append((row, col, object_index))
+    return found
+
+
+def best_time(function, *args):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def compare(name, layout, identifier):
+    text_layout = layout.astype(str).tolist()
+    scan_time, scanned = best_time(scan_cells, identifier, text_layout)
+    vector_time, _ = best_time(identifier.find_objects, layout)
+    print(f'{name:>12} {len(scanned):>8} {scan_time * 1000:>10.2f} {vector_time * 1000:>11.2f} {scan_time / vector_time:>7.1f}x')
+
+
+def main():
+    identifier = ObjectIdentifier()
+    print(f'{"layout":>12} {"objects":>8} {"scan ms":>10} {"vector ms":>11} {"speedup":>8}')
+    shipped, _ = import_csv_array(MAP_LAYERS['object'], raw = True)
+    compare('shipped', shipped, identifier)
+    for map_size in MAP_SIZES:
+        compare(f'{map_size}x{map_size}', random_layout(map_size, identifier, map_size), identifier)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Compare static tiles as Tile sprites with the StaticTiles array store.
+
+Fills square maps with grass, object and boundary tiles, both ways, and
+reports build time, memory per tile and collision query time; that both
+find the same obstacles is tested in tests/test_static_tiles.py. Run from the
+project root:  python code/bench_static_tiles.py
+"""
+import random
+import time
+import tracemalloc
+import pygame
+from settings import *
+from tile import Tile
+from spatial_hash import ObstacleGroup, SpatialGroup
+from static_tiles import StaticTiles
+
+MAP_SIZES = [64, 128, 256]
+TILE_DENSITY = 0.5
+QUERIES = 20000
+
+
+class VisibleGroup(SpatialGroup):
+    y_sorted = True
+
+
+def layout(map_size, seed):
+    """(pos, sprite_type) of every tile, the way create_map places them."""
+    rng = random.Random(seed)
+    tiles = []
+    for row in range(map_size):
+        for col in range(map_size):
+            if rng.random() < TILE_DENSITY:
+                tiles.append(((col * TILESIZE, row * TILESIZE), rng.choice(('invisible', 'grass', 'object'))))
+    return tiles
+
+
+def build_sprites(tiles, surface):
+    visible, obstacles = VisibleGroup(), ObstacleGroup()
+    for pos, sprite_type in tiles:
+        groups = [obstacles] if sprite_type == 'invisible' else [visible, obstacles]
+        Tile(pos, groups, sprite_type, surface)
+    # Sprites are indexed on the first query
+    visible.flush()
+    obstacles.flush()
+    return visible, obstacles
+
+
+def build_store(tiles, surface):
+    store = StaticTiles()
+    visible, obstacles = VisibleGroup(tiles = store), ObstacleGroup(tiles = store)
+    for pos, sprite_type in tiles:
+        groups = [obstacles] if sprite_type == 'invisible' else [visible, obstacles]
+        store.add(pos, groups, sprite_type, surface)
+    return visible, obstacles
+
+
+def measure(build, tiles, surface):
+    start = time.perf_counter()
+    groups = build(tiles, surface)
+    build_time = time.perf_counter() - start
+    # Memory is traced on a second build, tracing slows the first one down
+    tracemalloc.start()
+    build(tiles, surface)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return groups, build_time, memory
+
+
+def query_time(obstacles, map_size, seed):
+    rng = random.Random(seed)
+    probes = [pygame.Rect(rng.randrange(map_size * TILESIZE), rng.randrange(map_size * TILESIZE), 64, 64) for _ in range(QUERIES)]
+    start = time.perf_counter()
+    # What Entity.collision asks for on every move
+    for probe in probes:
+        obstacles.nearby_hitboxes(probe)
+    return time.perf_counter() - start
+
+
+def main():
+    surface = pygame.Surface((TILESIZE, TILESIZE))
+    print(f'{"map":>9} {"tiles":>7} {"sprite ms":>10} {"store ms":>9} {"sprite B/tile":>14} {"store B/tile":>13} {"sprite query ms":>16} {"store query ms":>15}')
+    for map_size in MAP_SIZES:
+        tiles = layout(map_size, map_size)
+        (_, sprite_obstacles), sprite_build, sprite_memory = measure(build_sprites, tiles, surface)
+        (_, store_obstacles), store_build, store_memory = measure(build_store, tiles, surface)
+        sprite_query = query_time(sprite_obstacles, map_size, map_size)
+        store_query = query_time(store_obstacles, map_size, map_size)
+        print(f'{map_size:>4}x{map_size:<4} {len(tiles):>7} {sprite_build * 1000:>10.1f} {store_build * 1000:>9.1f} '
+              f'{sprite_memory / len(tiles):>14.0f} {store_memory / len(tiles):>13.0f} '
+              f'{sprite_query * 1000:>16.1f} {store_query * 1000:>15.1f}')
+
+
+if __name__ == '__main__':
+    main()
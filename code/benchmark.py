@@ -0,0 +1,202 @@
+"""Headless frame benchmark for the game loop.
+
+Builds a Level from the shipped map with the SDL dummy video driver, steps it
+without a frame cap while a script drives the player, and reports per-phase
+frame timings. Frames go through Level.update and Level.draw like main.py; the
+custom_draw, update and ui.display timings come from the profiler sections
+the level records, and --profile also exports them with every other section.
+Run from the project root, for example:
+
+    python code/benchmark.py --frames 600 --enemies 0 200 1000 --map-scale 1 2
+
+With --replay, a session recorded with main.py --record drives the player
+instead, for as many frames as it has steps, with the clock it was recorded
+with, so every run plays out the same.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+import numpy as np
+import pygame
+from settings import *
+from map_compiler import MAP_LAYERS, SPAWN_TYPES
+from support import import_csv_array
+from profiler import profiler
+from input_source import ScriptedKeys, InputReplay
+
+PHASES = ('custom_draw', 'update', 'ui_display', 'frame')
+# Profiler section behind each phase; frame is timed by the benchmark itself
+PHASE_SECTIONS = {'custom_draw': 'custom_draw', 'update': 'update', 'ui_display': 'ui.display'}
+PERCENTILES = (50, 95, 99)
+
+
+def scripted_input(frame):
+    """Walk a square, turning every 90 frames, and attack every 45 frames."""
+    walk_keys = (pygame.K_d, pygame.K_s, pygame.K_a, pygame.K_w)
+    pressed = [walk_keys[(frame // 90) % len(walk_keys)]]
+    if frame % 45 == 0:
+        pressed.append(pygame.K_SPACE)
+    return ScriptedKeys(pressed)
+
+
+class ScriptedInput:
+    """Input source for the scripted walk, on a clock that advances one SIM_STEP per step."""
+    def __init__(self):
+        self.frame = 0
+        self.keys = ScriptedKeys()
+        self.ticks = 0
+
+    def step(self):
+        self.keys = scripted_input(self.frame)
+        self.ticks = round(self.frame * SIM_STEP * 1000)
+        self.frame += 1
+
+
+def scaled_layers(scale, directory):
+    """Tile every shipped layer scale x scale times into CSVs under directory."""
+    if scale == 1:
+        return dict(MAP_LAYERS)
+    layers = {}
+    for name, path in MAP_LAYERS.items():
+        layout, irregular = import_csv_array(path, raw = True)
+        text = layout.astype(str)
+        for (row, col), cell in irregular.items():
+            text[row, col] = cell
+        scaled_path = os.path.join(directory, f'{name}_x{scale}.csv')
+        with open(scaled_path, 'w') as layer_file:
+            for row in np.tile(text, (scale, scale)):
+                layer_file.write(','.join(row) + '\n')
+        layers[name] = scaled_path
+    return layers
+
+
+def add_enemies(level, count, seed):
+    """Spawn extra enemies on random tiles that are clear of obstacles."""
+    from enemy import Enemy
+    rng = random.Random(seed)
+    height, width = level.map_size
+    placed = 0
+    while placed < count:
+        pos = (rng.randrange(width) * TILESIZE + level.map_offset[0], rng.randrange(height) * TILESIZE + level.map_offset[1])
+        if level.obstacle_sprites.nearby(pygame.Rect(pos, (TILESIZE, TILESIZE)), 0):
+            continue
+        Enemy(rng.choice(SPAWN_TYPES[1:]), pos, [level.visible_sprites], level.obstacle_sprites, level.enemy_system)
+        placed += 1
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_case(screen, frames, enemies, scale, seed, directory, profile = None, streaming = False, replay = None):
+    from level import Level
+    random.seed(seed)
+    profiler.reset()
+    # The phase timings are read from the profiler, so it keeps every frame
+    profiler.enabled = True
+    profiler.history_length = max(frames, 1)
+    layers = scaled_layers(scale, directory)
+    cache = os.path.join(directory, f'map_x{scale}.compiled.npz')
+    if replay:
+        input_source = InputReplay(replay)
+        frames = len(input_source.steps)
+    else:
+        input_source = ScriptedInput()
+
+    # create_map prints a line per enemy
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        level = Level(layers, cache, streaming, input_source = input_source)
+        add_enemies(level, enemies, seed)
+        load_time = time.perf_counter() - start
+
+    frame_times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for frame in range(frames):
+            frame_start = time.perf_counter()
+            level.update(SIM_STEP)
+            # One step per frame, so the latest step is drawn as it is
+            screen.fill('black')
+            level.draw(1.0)
+            pygame.display.update()
+            frame_times.append(time.perf_counter() - frame_start)
+            if frame == 0:
+                profiler.mark('first_frame', time.perf_counter() - start)
+            profiler.end_frame()
+    level.close()
+
+    timings = {phase: list(profiler.histories.get(section, [0.0])) for phase, section in PHASE_SECTIONS.items()}
+    timings['frame'] = frame_times
+
+    if profile:
+        profiler.export_json(f'{profile}_x{scale}_e{enemies}.json')
+        profiler.export_csv(f'{profile}_x{scale}_e{enemies}.csv')
+
+    result = {
+        'map_scale': scale,
+        'map_tiles': list(level.map_size),
+        'enemies': enemies,
+        'streaming': streaming,
+        'sprites': len(level.visible_sprites) + level.visible_sprites.tile_count(),
+        'obstacles': len(level.obstacle_sprites) + level.obstacle_sprites.tile_count(),
+        'frames': frames,
+        'replay': replay,
+        'player_pos': list(level.player.hitbox.center),
+        'load_ms': load_time * 1000,
+    }
+    for phase, values in timings.items():
+        for percent in PERCENTILES:
+            result[f'{phase}_p{percent}_ms'] = percentile(values, percent) * 1000
+    return result
+
+
+def print_results(results):
+    header = f'{"map":>9} {"enemies":>7} {"sprites":>7}'
+    for phase in PHASES:
+        header += f' {phase + " p50/p95/p99 ms":>32}'
+    print(header)
+    for result in results:
+        height, width = result['map_tiles']
+        line = f'{width:>4}x{height:<4} {result["enemies"]:>7} {result["sprites"]:>7}'
+        for phase in PHASES:
+            line += ' {:>32}'.format('/'.join(f'{result[f"{phase}_p{percent}_ms"]:.2f}' for percent in PERCENTILES))
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--frames', type = int, default = 600)
+    parser.add_argument('--enemies', type = int, nargs = '+', default = [0], help = 'extra enemies to spawn')
+    parser.add_argument('--map-scale', type = int, nargs = '+', default = [1], help = 'tile the shipped map NxN times')
+    parser.add_argument('--seed', type = int, default = 1)
+    parser.add_argument('--json', help = 'also write the results to this file')
+    parser.add_argument('--streaming', action = 'store_true', help = 'load the map in chunks around the player')
+    parser.add_argument('--replay', metavar = 'FILE', help = 'drive the player with a recording from main.py --record instead of the script')
+    parser.add_argument('--profile', help = 'enable the frame profiler and export its history to PROFILE_x<scale>_e<enemies>.json/.csv')
+    args = parser.parse_args()
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.map_scale:
+            for enemies in args.enemies:
+                results.append(run_case(screen, args.frames, enemies, scale, args.seed, directory, args.profile, args.streaming, args.replay))
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w') as results_file:
+            json.dump(results, results_file, indent = 2)
+
+
+if __name__ == '__main__':
+    main()
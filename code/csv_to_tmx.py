@@ -1,11 +1,33 @@
+"""Convert CSV map layers into a Tiled TMX map.
+
+Layers are streamed row by row straight into the output file, so the
+converter needs the same memory whatever the map size, and the map size
+is read from the CSVs. Run from the folder holding the CSVs:
+
+    python csv_to_tmx.py                                    # csv_layers -> recovered_map.tmx
+    python csv_to_tmx.py --encoding base64 --compression zlib
+    python csv_to_tmx.py --batch maps/ more_maps/ --output exported/ --workers 4
+
+Batch mode converts every <map>_<layer>.csv set found in the folders, one map
+per worker process.
+"""
+import argparse
+import base64
 import csv
 import os
-from xml.etree.ElementTree import Element, SubElement, ElementTree
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import quoteattr
+
+try:
+    import zstandard
+except ImportError:
+    # Only needed for --compression zstd
+    zstandard = None
 
 # ---- CONFIG ----
 TILESIZE = 32
-MAP_WIDTH = 64   # adjust to your map width in tiles
-MAP_HEIGHT = 64  # adjust to your map height in tiles
 
 # all your CSV layers
 csv_layers = {
@@ -22,65 +44,178 @@ tileset_image = "graphics/tileset.png"
 output_file = "recovered_map.tmx"
 # ----------------
 
+# CSV file name suffix of each layer, as in mappington_boundary_blocks.csv
+LAYER_SUFFIXES = {name: os.path.splitext(path)[0].split("_", 1)[1] for name, path in csv_layers.items()}
+ENCODINGS = ("csv", "base64")
+COMPRESSIONS = ("zlib", "gzip", "zstd")
+
+# The one tileset written starts at GID 1, so GID = CSV tile id + FIRSTGID
+FIRSTGID = 1
+# Tiled's flip flags, in the top bits of a GID (and the sign bit of a CSV id)
+FLIP_FLAGS = 0xF0000000
+
+
+def tile_gid(cell):
+    """GID of a CSV cell: 0 for blank or -1, otherwise its tile id + FIRSTGID with the flip flags kept."""
+    cell = cell.strip()
+    if cell == "" or cell == "-1":
+        return 0
+    value = int(cell) & 0xFFFFFFFF
+    return (value & FLIP_FLAGS) | ((value & ~FLIP_FLAGS) + FIRSTGID)
+
 
-def load_csv(path):
+def read_rows(path):
+    """Yield each CSV row as GIDs."""
     with open(path, newline='') as f:
-        reader = csv.reader(f)
-        return [[int(cell) if cell.strip() != "" and cell != "-1" else 0 for cell in row] for row in reader]
-
-
-def build_tmx():
-    # root map element
-    map_elem = Element("map", {
-        "version": "1.8",
-        "tiledversion": "1.8.4",
-        "orientation": "orthogonal",
-        "renderorder": "right-down",
-        "width": str(MAP_WIDTH),
-        "height": str(MAP_HEIGHT),
-        "tilewidth": str(TILESIZE),
-        "tileheight": str(TILESIZE),
-        "infinite": "0",
-        "nextlayerid": str(len(csv_layers) + 1),
-        "nextobjectid": "1"
-    })
-
-    # tileset
-    tileset = SubElement(map_elem, "tileset", {
-        "firstgid": "1",
-        "name": "tileset",
-        "tilewidth": str(TILESIZE),
-        "tileheight": str(TILESIZE),
-        "tilecount": "1000",   # adjust if needed
-        "columns": "20"        # adjust to match your tileset layout
-    })
-    SubElement(tileset, "image", {
-        "source": tileset_image,
-        "width": "640",   # adjust to actual tileset PNG width
-        "height": "640"   # adjust to actual tileset PNG height
-    })
-
-    # add each CSV as a layer
-    layer_id = 1
-    for name, path in csv_layers.items():
-        data = load_csv(path)
-        layer = SubElement(map_elem, "layer", {
-            "id": str(layer_id),
-            "name": name,
-            "width": str(MAP_WIDTH),
-            "height": str(MAP_HEIGHT)
-        })
-        data_elem = SubElement(layer, "data", {"encoding": "csv"})
-        # flatten the 2D array into CSV text
-        flat = [str(cell) for row in data for cell in row]
-        data_elem.text = ",".join(flat)
-        layer_id += 1
-
-    # save
-    tree = ElementTree(map_elem)
-    tree.write(output_file, encoding="UTF-8", xml_declaration=True)
-    print(f"✅ Saved {output_file}")
+        for row in csv.reader(f):
+            yield [tile_gid(cell) for cell in row]
+
+
+def layer_size(path):
+    """(width, height) of a CSV layer in tiles, without keeping its rows."""
+    width = height = 0
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            width = max(width, len(row))
+            height += 1
+    return width, height
+
+
+def padded_rows(path, width, height):
+    """Rows padded with 0 up to width x height, so every layer matches the map size."""
+    count = 0
+    for row in read_rows(path):
+        yield row + [0] * (width - len(row))
+        count += 1
+    for _ in range(height - count):
+        yield [0] * width
+
+
+def make_compressor(compression):
+    if compression is None:
+        return None
+    if compression == "zlib":
+        return zlib.compressobj()
+    if compression == "gzip":
+        return zlib.compressobj(wbits = 31)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression needs the zstandard package (pip install zstandard)")
+        return zstandard.ZstdCompressor().compressobj()
+    raise ValueError(f"unknown compression {compression!r}, expected one of {COMPRESSIONS}")
+
+
+def csv_chunks(rows):
+    """Layer data in Tiled's own CSV layout: one line per row, rows ending in a comma."""
+    previous = None
+    for row in rows:
+        if previous is not None:
+            yield previous + ",\n"
+        previous = ",".join(map(str, row))
+    if previous is not None:
+        yield previous + "\n"
+
+
+def base64_chunks(rows, compression):
+    """Layer data as little-endian uint32 GIDs, optionally compressed, in base64."""
+    compressor = make_compressor(compression)
+    pending = b""
+    for row in rows:
+        data = struct.pack(f"<{len(row)}I", *row)
+        pending += compressor.compress(data) if compressor else data
+        # base64 turns every 3 bytes into 4 characters, so only whole groups go out
+        cut = len(pending) - len(pending) % 3
+        if cut:
+            yield base64.b64encode(pending[:cut]).decode("ascii")
+            pending = pending[cut:]
+    if compressor:
+        pending += compressor.flush()
+    yield base64.b64encode(pending).decode("ascii")
+
+
+def write_tmx(layers, output, encoding = "csv", compression = None, tileset_source = tileset_image):
+    """Stream the {name: csv path} layers into one TMX file."""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"unknown encoding {encoding!r}, expected one of {ENCODINGS}")
+    if compression is not None and encoding != "base64":
+        raise ValueError("compression needs the base64 encoding")
+    make_compressor(compression)
+
+    sizes = [layer_size(path) for path in layers.values()]
+    width = max((size[0] for size in sizes), default = 0)
+    height = max((size[1] for size in sizes), default = 0)
+
+    with open(output, "w", encoding = "UTF-8") as tmx:
+        tmx.write("<?xml version='1.0' encoding='UTF-8'?>\n")
+        tmx.write(f'<map version="1.8" tiledversion="1.8.4" orientation="orthogonal" renderorder="right-down" '
+                  f'width="{width}" height="{height}" tilewidth="{TILESIZE}" tileheight="{TILESIZE}" '
+                  f'infinite="0" nextlayerid="{len(layers) + 1}" nextobjectid="1">\n')
+        # tilecount, columns and the image size are placeholders; adjust them to your tileset
+        tmx.write(f' <tileset firstgid="{FIRSTGID}" name="tileset" tilewidth="{TILESIZE}" tileheight="{TILESIZE}" tilecount="1000" columns="20">\n')
+        tmx.write(f'  <image source={quoteattr(tileset_source)} width="640" height="640"/>\n')
+        tmx.write(' </tileset>\n')
+
+        for layer_id, (name, path) in enumerate(layers.items(), 1):
+            tmx.write(f' <layer id="{layer_id}" name={quoteattr(name)} width="{width}" height="{height}">\n')
+            rows = padded_rows(path, width, height)
+            if encoding == "csv":
+                tmx.write('  <data encoding="csv">\n')
+                chunks = csv_chunks(rows)
+            else:
+                compression_attr = f' compression="{compression}"' if compression else ""
+                tmx.write(f'  <data encoding="base64"{compression_attr}>\n   ')
+                chunks = base64_chunks(rows, compression)
+            for chunk in chunks:
+                tmx.write(chunk)
+            if encoding != "csv":
+                tmx.write("\n")
+            tmx.write("</data>\n </layer>\n")
+        tmx.write("</map>\n")
+    return output
+
+
+def find_maps(folder):
+    """{map name: {layer name: csv path}} for the <map>_<layer>.csv files in a folder."""
+    maps = {}
+    for filename in sorted(os.listdir(folder)):
+        for name, suffix in LAYER_SUFFIXES.items():
+            if filename.endswith(f"_{suffix}.csv"):
+                map_name = filename[:-len(f"_{suffix}.csv")]
+                maps.setdefault(map_name, {})[name] = os.path.join(folder, filename)
+    # Layers in the same order as csv_layers, whatever order the files were found in
+    return {map_name: {name: layers[name] for name in LAYER_SUFFIXES if name in layers}
+            for map_name, layers in maps.items()}
+
+
+def convert_batch(folders, output_folder, encoding = "csv", compression = None, workers = None):
+    """Convert every map found in folders, in parallel worker processes."""
+    os.makedirs(output_folder, exist_ok = True)
+    jobs = []
+    for folder in folders:
+        for map_name, layers in find_maps(folder).items():
+            jobs.append((layers, os.path.join(output_folder, f"{map_name}.tmx")))
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        futures = [executor.submit(write_tmx, layers, output, encoding, compression) for layers, output in jobs]
+        return [future.result() for future in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--encoding", choices = ENCODINGS, default = "csv")
+    parser.add_argument("--compression", choices = COMPRESSIONS, help = "compress base64 layer data")
+    parser.add_argument("--batch", nargs = "+", metavar = "FOLDER", help = "convert every map in these folders")
+    parser.add_argument("--output", help = "output file, or output folder with --batch")
+    parser.add_argument("--workers", type = int, help = "worker processes for --batch (default: one per CPU)")
+    args = parser.parse_args()
+    encoding = "base64" if args.compression else args.encoding
+
+    if args.batch:
+        for output in convert_batch(args.batch, args.output or ".", encoding, args.compression, args.workers):
+            print(f"✅ Saved {output}")
+    else:
+        output = write_tmx(csv_layers, args.output or output_file, encoding, args.compression)
+        print(f"✅ Saved {output}")
 
 
 if __name__ == "__main__":
-    build_tmx()
+    main()
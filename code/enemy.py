@@ -2,14 +2,15 @@ import pygame
 from settings import *
 from entity import Entity
 from support import *
+from spatial_hash import ObstacleGroup, SpatialGroup
 
 class Enemy(Entity):
-    def __init__(self, monster_name, pos, groups, obstacle_sprites=None):
+    def __init__(self, monster_name, pos, groups, obstacle_sprites=None, enemy_system=None):
         super().__init__(groups)
         self.sprite_type = 'enemy'
         
         # Store obstacle sprites for collision detection
-        self.obstacle_sprites = obstacle_sprites or pygame.sprite.Group()
+        self.obstacle_sprites = obstacle_sprites if obstacle_sprites is not None else ObstacleGroup()
 
         #graphics setup
         self.import_graphics(monster_name)
@@ -47,6 +48,14 @@ class Enemy(Entity):
             self.attack_radius = 50
             self.notice_radius = 100
 
+        # AI decisions come from the shared enemy system, which sets status and direction
+        # and parks the enemy (asleep) while it is far from the camera
+        self.asleep = False
+        self.sleep_time = 0.0
+        self.enemy_system = enemy_system
+        if enemy_system is not None:
+            enemy_system.add(self)
+
     def import_graphics(self, name):
         self.animations = {'idle': [], 'move': [], 'attack': []}
         main = f'./graphics/monsters/{name}/'
@@ -57,6 +66,43 @@ class Enemy(Entity):
                 print(f"Warning: Animation folder {main + animation} not found")
                 self.animations[animation] = []
     
-    def update(self):
-        # Basic enemy update - you can expand this with AI behavior later
-        pass
\ No newline at end of file
+    def animate(self, dt = SIM_STEP):
+        animation = self.animations[self.status]
+        if not animation:
+            return
+        self.frame_index += self.animation_speed * dt * FPS
+        if self.frame_index >= len(animation):
+            self.frame_index = 0
+
+        self.image = animation[int(self.frame_index)]
+        self.rect = self.image.get_rect(center=self.hitbox.center)
+
+    def park(self, time):
+        """Hide from the spatial groups until wake(), so the enemy is neither drawn nor updated."""
+        self.asleep = True
+        self.sleep_time = time
+        for group in self.groups():
+            if isinstance(group, SpatialGroup):
+                group.hide(self)
+
+    def wake(self, slept):
+        """Resume after being parked, advancing the animation by the time spent asleep."""
+        self.asleep = False
+        for group in self.groups():
+            if isinstance(group, SpatialGroup):
+                group.show(self)
+        animation = self.animations[self.status]
+        if animation:
+            self.frame_index = (self.frame_index + self.animation_speed * slept * FPS) % len(animation)
+
+    def kill(self):
+        if self.enemy_system is not None:
+            self.enemy_system.remove(self)
+        super().kill()
+
+    def update(self, dt = SIM_STEP):
+        if self.status == 'move':
+            self.move(self.speed, dt)
+            if self.enemy_system is not None:
+                self.enemy_system.sync_position(self)
+        self.animate(dt)
\ No newline at end of file
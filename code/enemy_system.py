@@ -0,0 +1,125 @@
+import numpy as np
+import pygame
+from settings import *
+from spatial_hash import SpatialHash
+
+# Enemy status for each state code
+STATES = ('idle', 'move', 'attack')
+IDLE, MOVE, ATTACK = range(len(STATES))
+
+
+class EnemySystem:
+    """Decides what every enemy does in one vectorized pass per step.
+
+    Positions and radii live in contiguous arrays indexed by enemy.system_index.
+    Each update works out the distance to the player, the idle/move/attack
+    state and the chase direction for the enemies around the player at once,
+    then writes the results back only to the enemies whose state changed or
+    that are moving. Moving enemies report their new position through
+    sync_position(). With a flow_field set, chasing enemies follow it around
+    obstacles, each on the field for its hitbox size.
+
+    Enemies further than activity_radius from the camera are parked: they are
+    hidden from their groups, so they are neither drawn, updated nor collided
+    with. A spatial hash of enemy hitboxes finds the ones in range, so a step
+    only looks at the awake enemies and those the player came near; parked
+    enemies elsewhere cost nothing. When they come back in range they catch
+    up on the time they slept in one coarse step.
+    """
+    def __init__(self, flow_field = None, activity_radius = ACTIVITY_RADIUS):
+        self.flow_field = flow_field
+        self.activity_radius = activity_radius
+        self.time = 0.0
+        self.awake = np.zeros(0, dtype = bool)
+        self.awake_indices = np.zeros(0, dtype = int)
+        self.spatial_hash = SpatialHash(ACTIVITY_CELL_SIZE)
+        self.enemies = []
+        self.dirty = False
+        self.positions = np.zeros((0, 2))
+        self.sizes = np.zeros((0, 2), dtype = int)
+        self.notice_radius = np.zeros(0)
+        self.attack_radius = np.zeros(0)
+        self.states = np.zeros(0, dtype = np.int8)
+
+    def add(self, enemy):
+        self.enemies.append(enemy)
+        self.dirty = True
+
+    def remove(self, enemy):
+        if enemy in self.enemies:
+            self.enemies.remove(enemy)
+            self.dirty = True
+
+    def rebuild(self):
+        """Refill the arrays from the enemy list after enemies were added or removed."""
+        for index, enemy in enumerate(self.enemies):
+            enemy.system_index = index
+        self.positions = np.array([enemy.hitbox.center for enemy in self.enemies], dtype = float).reshape(-1, 2)
+        self.sizes = np.array([enemy.hitbox.size for enemy in self.enemies], dtype = int).reshape(-1, 2)
+        self.notice_radius = np.array([enemy.notice_radius for enemy in self.enemies], dtype = float)
+        self.attack_radius = np.array([enemy.attack_radius for enemy in self.enemies], dtype = float)
+        self.states = np.array([STATES.index(enemy.status) for enemy in self.enemies], dtype = np.int8)
+        self.awake = np.array([not enemy.asleep for enemy in self.enemies], dtype = bool)
+        self.awake_indices = np.nonzero(self.awake)[0]
+        self.spatial_hash.clear()
+        for index, enemy in enumerate(self.enemies):
+            self.spatial_hash.insert(enemy, enemy.hitbox, index)
+        self.dirty = False
+
+    def sync_position(self, enemy):
+        if not self.dirty:
+            self.positions[enemy.system_index] = enemy.hitbox.center
+            self.spatial_hash.insert(enemy, enemy.hitbox, enemy.system_index)
+
+    def update(self, player, dt = SIM_STEP):
+        self.time += dt
+        if self.dirty:
+            self.rebuild()
+        if not self.enemies:
+            return
+
+        # The camera follows the player, so distance to the player is distance to the camera.
+        # Only enemies that were awake or are near enough to wake up need looking at
+        center = player.hitbox.center
+        area = pygame.Rect(0, 0, self.activity_radius * 2, self.activity_radius * 2)
+        area.center = center
+        nearby = np.array([enemy.system_index for enemy in self.spatial_hash.query(area)], dtype = int)
+        candidates = np.union1d(nearby, self.awake_indices)
+        if not len(candidates):
+            return
+
+        positions = self.positions[candidates]
+        offsets = np.array(center, dtype = float) - positions
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        awake = distances <= self.activity_radius
+        for index in np.nonzero(awake != self.awake[candidates])[0]:
+            enemy = self.enemies[candidates[index]]
+            if awake[index]:
+                enemy.wake(self.time - enemy.sleep_time)
+            else:
+                enemy.park(self.time)
+        self.awake[candidates] = awake
+        self.awake_indices = candidates[awake]
+
+        states = np.full(len(candidates), IDLE, dtype = np.int8)
+        states[awake & (distances <= self.notice_radius[candidates])] = MOVE
+        states[awake & (distances <= self.attack_radius[candidates])] = ATTACK
+
+        chasing = (states == MOVE) & (distances > 0)
+        directions = np.zeros_like(offsets)
+        directions[chasing] = offsets[chasing] / distances[chasing, None]
+        if self.flow_field is not None and chasing.any():
+            self.flow_field.update(center)
+            steps, valid = self.flow_field.lookup(positions[chasing], self.sizes[candidates][chasing])
+            chase_directions = directions[chasing]
+            chase_directions[valid] = steps[valid]
+            directions[chasing] = chase_directions
+
+        for index in np.nonzero(states != self.states[candidates])[0]:
+            enemy = self.enemies[candidates[index]]
+            enemy.status = STATES[states[index]]
+            enemy.frame_index = 0
+            enemy.direction.update(0, 0)
+        for index in np.nonzero(chasing)[0]:
+            self.enemies[candidates[index]].direction.update(directions[index, 0], directions[index, 1])
+        self.states[candidates] = states
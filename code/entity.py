@@ -1,4 +1,6 @@
 import pygame
+from settings import *
+from profiler import profiler
 
 class Entity(pygame.sprite.Sprite):
     def __init__(self, groups):
@@ -6,30 +8,49 @@ class Entity(pygame.sprite.Sprite):
         self.frame_index = 0
         self.animation_speed = 0.15
         self.direction = pygame.math.Vector2()
+        # Hitbox topleft as floats, so steps shorter than a pixel still add up
+        self.position = None
     
-    def move(self, speed):
-        if self.direction.magnitude() != 0:
-            self.direction = self.direction.normalize()
+    def move(self, speed, dt = SIM_STEP):
+        with profiler.section('entity.move'):
+            if self.direction.magnitude() != 0:
+                self.direction = self.direction.normalize()
 
-        self.hitbox.x += self.direction.x * speed
-        self.collision('horizontal')
-        self.hitbox.y += self.direction.y * speed
-        self.collision('vertical')  
-        self.rect.center = self.hitbox.center
-        
-    def collision(self, direction):        
-        if direction == 'horizontal':
-            for sprite in self.obstacle_sprites:
-                if sprite.hitbox.colliderect(self.hitbox):
-                    if self.direction.x > 0: # Moving right
-                        self.hitbox.right = sprite.hitbox.left
-                    if self.direction.x < 0: # Moving left
-                        self.hitbox.left = sprite.hitbox.right
-                        
-        if direction == 'vertical':
-            for sprite in self.obstacle_sprites:
-                if sprite.hitbox.colliderect(self.hitbox):
-                    if self.direction.y > 0: # Moving down
-                        self.hitbox.bottom = sprite.hitbox.top
-                    if self.direction.y < 0: # Moving up
-                        self.hitbox.top = sprite.hitbox.bottom
\ No newline at end of file
+            position = self.position
+            if position is None or (round(position.x), round(position.y)) != self.hitbox.topleft:
+                # The hitbox was placed from outside, carry on from where it is
+                position = self.position = pygame.math.Vector2(self.hitbox.topleft)
+
+            distance = speed * dt * FPS
+            position.x += self.direction.x * distance
+            self.hitbox.x = round(position.x)
+            self.collision('horizontal')
+            if self.hitbox.x != round(position.x):
+                # Pushed back by an obstacle
+                position.x = self.hitbox.x
+            position.y += self.direction.y * distance
+            self.hitbox.y = round(position.y)
+            self.collision('vertical')
+            if self.hitbox.y != round(position.y):
+                position.y = self.hitbox.y
+            self.rect.center = self.hitbox.center
+
+    def collision(self, direction):
+        with profiler.section('entity.collision'):
+            # Only obstacles in the grid cells around the hitbox can collide
+            nearby = self.obstacle_sprites.nearby_hitboxes(self.hitbox)
+            if direction == 'horizontal':
+                for hitbox in nearby:
+                    if hitbox.colliderect(self.hitbox):
+                        if self.direction.x > 0: # Moving right
+                            self.hitbox.right = hitbox.left
+                        if self.direction.x < 0: # Moving left
+                            self.hitbox.left = hitbox.right
+
+            if direction == 'vertical':
+                for hitbox in nearby:
+                    if hitbox.colliderect(self.hitbox):
+                        if self.direction.y > 0: # Moving down
+                            self.hitbox.bottom = hitbox.top
+                        if self.direction.y < 0: # Moving up
+                            self.hitbox.top = hitbox.bottom
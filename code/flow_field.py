@@ -0,0 +1,230 @@
+from collections import deque
+import numpy as np
+import pygame
+from settings import *
+
+# Neighbour offsets as (row, col); the first four are the orthogonal ones
+NEIGHBOURS = ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+def clearance(size):
+    """Tiles an agent's hitbox of size (width, height) can reach past the tile its center is on.
+
+    Returns (up, down, left, right): wherever the center is inside its tile, the
+    hitbox stays within that many tiles above, below, left and right of it.
+    """
+    width, height = size
+    # Rect.center is left + width // 2, so the hitbox starts width // 2 left of the center
+    return (-(-(height // 2) // TILESIZE), (TILESIZE - 2 + height - height // 2) // TILESIZE,
+            -(-(width // 2) // TILESIZE), (TILESIZE - 2 + width - width // 2) // TILESIZE)
+
+
+class ClearanceField:
+    """The flow field for one hitbox size class, on tiles dilated by its clearance."""
+    def __init__(self, map_size, reach):
+        self.reach = reach
+        self.blocked = None
+        self.target_cell = None
+        self.window = (0, 0, 0, 0)
+        self.distance = np.full(map_size, np.inf)
+        self.steps = np.zeros(map_size + (2,), dtype = np.int8)
+        self.valid = np.zeros(map_size, dtype = bool)
+
+
+class FlowField:
+    """Shared tile-grid distance maps towards the player, one per hitbox size class.
+
+    A breadth-first search from the player's tile, limited to `radius` tiles
+    around it, is rebuilt only when the player moves to another tile. Each
+    reachable tile stores its neighbour closest to the player, so any number
+    of chasing enemies can look up their next step in O(1).
+    Diagonal steps are only taken when both orthogonal tiles are free.
+
+    An agent is steered from its center tile, but its hitbox covers more than
+    that tile. Each size class searches its own copy of the grid, where a tile
+    is only free when every tile the hitbox can touch from it is, and agents
+    head for the center of the next tile, so a hitbox never clips a wall
+    corner. Agents pushed onto a tile that is too tight for them are led back
+    to the nearest roomy one.
+    """
+    def __init__(self, obstacle_sprites, map_size, map_offset, radius = FLOW_FIELD_RADIUS):
+        self.obstacle_sprites = obstacle_sprites
+        self.map_size = tuple(map_size)
+        self.map_offset = map_offset
+        self.radius = radius
+        self.target_cell = None
+        self.blocked = np.zeros(self.map_size, dtype = bool)
+        self.fields = {}
+        self.refresh_obstacles()
+
+    def refresh_obstacles(self):
+        """Re-mark blocked tiles from the obstacle hitboxes; call after obstacles change."""
+        rows, cols = self.map_size
+        self.refresh_area(pygame.Rect(self.map_offset, (cols * TILESIZE, rows * TILESIZE)))
+
+    def refresh_area(self, rect):
+        """Re-mark blocked tiles under a world rect, after obstacles there were added or removed."""
+        rows, cols = self.tiles_under(rect)
+        self.blocked[rows, cols] = False
+        # Obstacles just outside rect can still reach into its edge tiles
+        tile_rect = pygame.Rect(cols.start * TILESIZE + self.map_offset[0], rows.start * TILESIZE + self.map_offset[1],
+                                (cols.stop - cols.start) * TILESIZE, (rows.stop - rows.start) * TILESIZE)
+        for sprite in self.obstacle_sprites.query(tile_rect):
+            self.blocked[self.tiles_under(sprite.hitbox)] = True
+        # Every size class dilates the grid again and searches afresh
+        for field in self.fields.values():
+            field.blocked = None
+            field.target_cell = None
+
+    def tiles_under(self, rect):
+        """Slice of the tile grid covered by a world rect, clipped to the map."""
+        rows, cols = self.map_size
+        left = max(0, (rect.left - self.map_offset[0]) // TILESIZE)
+        top = max(0, (rect.top - self.map_offset[1]) // TILESIZE)
+        right = min(cols, (rect.right - 1 - self.map_offset[0]) // TILESIZE + 1)
+        bottom = min(rows, (rect.bottom - 1 - self.map_offset[1]) // TILESIZE + 1)
+        return slice(top, max(top, bottom)), slice(left, max(left, right))
+
+    def cells_of(self, positions):
+        """Tile (row, col) arrays for an (N, 2) array of world positions."""
+        cols = np.floor((positions[:, 0] - self.map_offset[0]) / TILESIZE).astype(int)
+        rows = np.floor((positions[:, 1] - self.map_offset[1]) / TILESIZE).astype(int)
+        return rows, cols
+
+    def update(self, target_pos):
+        rows, cols = self.cells_of(np.array([target_pos], dtype = float))
+        # Size classes are searched on their first lookup for this tile
+        self.target_cell = (int(rows[0]), int(cols[0]))
+
+    def dilate(self, reach):
+        """Tiles where a hitbox with this clearance would touch an obstacle or leave the map."""
+        up, down, left, right = reach
+        rows, cols = self.map_size
+        padded = np.pad(self.blocked, ((up, down), (left, right)), constant_values = True)
+        # Summed-area table: a tile is blocked when its clearance box holds any blocked tile
+        summed = np.pad(padded.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+        height, width = up + down + 1, left + right + 1
+        count = (summed[height:height + rows, width:width + cols] - summed[:rows, width:width + cols]
+                 - summed[height:height + rows, :cols] + summed[:rows, :cols])
+        return count > 0
+
+    def field(self, reach):
+        field = self.fields.get(reach)
+        if field is None:
+            field = self.fields[reach] = ClearanceField(self.map_size, reach)
+        if field.blocked is None:
+            field.blocked = self.dilate(reach) if any(reach) else self.blocked
+        if field.target_cell != self.target_cell:
+            field.target_cell = self.target_cell
+            self.rebuild(field, self.target_cell)
+        return field
+
+    def rebuild(self, field, cell):
+        rows, cols = self.map_size
+        # Only the previous search window holds results that need clearing
+        old_top, old_bottom, old_left, old_right = field.window
+        field.distance[old_top:old_bottom, old_left:old_right] = np.inf
+        field.valid[old_top:old_bottom, old_left:old_right] = False
+
+        top, left = max(0, cell[0] - self.radius), max(0, cell[1] - self.radius)
+        bottom, right = min(rows, cell[0] + self.radius + 1), min(cols, cell[1] + self.radius + 1)
+        if not (top <= cell[0] < bottom and left <= cell[1] < right):
+            field.window = (0, 0, 0, 0)
+            return
+        field.window = (top, bottom, left, right)
+
+        # Breadth-first search over roomy orthogonal neighbours inside the window,
+        # on a flat list since per-element NumPy indexing is slow
+        height, width = bottom - top, right - left
+        free = (~field.blocked[top:bottom, left:right]).ravel().tolist()
+        window_distance = [-1] * (height * width)
+        start = (cell[0] - top) * width + (cell[1] - left)
+        window_distance[start] = 0
+        queue = deque([start])
+        self.search(queue, window_distance, free, width)
+
+        # Then out into the tiles that are open but too tight for the hitbox, counting
+        # only the way back to a roomy tile, behind every roomy tile's distance
+        tight = (~self.blocked[top:bottom, left:right]).ravel().tolist()
+        escape = [-1 if distance < 0 else 0 for distance in window_distance]
+        self.search(deque(index for index, distance in enumerate(escape) if distance == 0), escape, tight, width)
+        beyond = height * width
+        window_distance = [distance if distance >= 0 or escape[index] < 0 else beyond + escape[index]
+                           for index, distance in enumerate(window_distance)]
+
+        window_distance = np.array(window_distance, dtype = float).reshape(height, width)
+        window_distance[window_distance < 0] = np.inf
+        field.distance[top:bottom, left:right] = window_distance
+
+        # Pick the closest neighbour for every tile in the window at once
+        window = window_distance
+        padded = self.around_window(field, field.distance, np.inf)
+        padded_blocked = self.around_window(field, field.blocked, True)
+        candidates = []
+        for row_step, col_step in NEIGHBOURS:
+            neighbour = padded[1 + row_step:1 + row_step + height, 1 + col_step:1 + col_step + width].copy()
+            if row_step and col_step:
+                corner_blocked = (padded_blocked[1 + row_step:1 + row_step + height, 1:1 + width]
+                                  | padded_blocked[1:1 + height, 1 + col_step:1 + col_step + width])
+                neighbour[corner_blocked] = np.inf
+            candidates.append(neighbour)
+        candidates = np.stack(candidates)
+        best = candidates.argmin(axis = 0)
+        best_distance = np.take_along_axis(candidates, best[None], axis = 0)[0]
+
+        field.steps[top:bottom, left:right] = np.array(NEIGHBOURS, dtype = np.int8)[best]
+        field.valid[top:bottom, left:right] = best_distance < window
+
+    @staticmethod
+    def search(queue, distance, free, width):
+        """Breadth-first search from the queued indexes over free tiles, filling in distance."""
+        while queue:
+            index = queue.popleft()
+            next_distance = distance[index] + 1
+            col = index % width
+            for neighbour in (index - width, index + width, index - 1 if col else -1, index + 1 if col + 1 < width else -1):
+                if 0 <= neighbour < len(free) and free[neighbour] and distance[neighbour] < 0:
+                    distance[neighbour] = next_distance
+                    queue.append(neighbour)
+
+    def around_window(self, field, array, fill):
+        """The search window plus a one-tile border, filled with fill past the map edge."""
+        top, bottom, left, right = field.window
+        rows, cols = self.map_size
+        border = array[max(0, top - 1):min(rows, bottom + 1), max(0, left - 1):min(cols, right + 1)]
+        padding = ((int(top == 0), int(bottom == rows)), (int(left == 0), int(right == cols)))
+        return np.pad(border, padding, constant_values = fill)
+
+    def lookup(self, positions, sizes = None):
+        """Unit (x, y) steps for an (N, 2) array of positions, and which of them are valid.
+
+        sizes is an (N, 2) array of hitbox (width, height) for the agents at those
+        positions; without it they are treated as points. Positions off the map,
+        outside the search window, walled in or on the player's own tile are not
+        valid; callers should head straight for the player instead.
+        """
+        directions = np.zeros((len(positions), 2))
+        valid = np.zeros(len(positions), dtype = bool)
+        if self.target_cell is None or not len(positions):
+            return directions, valid
+
+        rows, cols = self.cells_of(positions)
+        on_map = (rows >= 0) & (rows < self.map_size[0]) & (cols >= 0) & (cols < self.map_size[1])
+        rows, cols = np.where(on_map, rows, 0), np.where(on_map, cols, 0)
+        if sizes is None:
+            sizes = np.ones((len(positions), 2), dtype = int)
+        reaches = np.array([clearance(size) for size in np.asarray(sizes, dtype = int).tolist()]).reshape(-1, 4)
+        for reach in np.unique(reaches, axis = 0):
+            agents = (reaches == reach).all(axis = 1)
+            field = self.field(tuple(int(tiles) for tiles in reach))
+            steps = field.steps[rows[agents], cols[agents]]
+            valid[agents] = on_map[agents] & field.valid[rows[agents], cols[agents]]
+
+            # Head for the center of the next tile rather than along the step, so an
+            # agent off its tile's center comes back into line before turning
+            centers = np.stack([(cols[agents] + steps[:, 1] + 0.5) * TILESIZE + self.map_offset[0],
+                                (rows[agents] + steps[:, 0] + 0.5) * TILESIZE + self.map_offset[1]], axis = 1)
+            offsets = centers - positions[agents]
+            lengths = np.hypot(offsets[:, 0], offsets[:, 1])
+            directions[agents] = offsets / np.maximum(lengths, 1e-9)[:, None]
+        return directions, valid
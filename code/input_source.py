@@ -0,0 +1,94 @@
+"""Where the player's keys and clock come from.
+
+Level samples its input source once per simulation step, and Player (and the
+UI, through the player's cooldowns) reads keys and ticks from that sample
+instead of asking pygame. LiveInput samples the keyboard and pygame's clock,
+InputRecorder remembers every sample of another source, and InputReplay
+plays a saved recording back step by step, so a recorded session runs the
+same way every time, headless and as fast as the machine allows:
+
+    python code/main.py --record session.json
+    python code/main.py --replay session.json
+    python code/benchmark.py --replay session.json
+"""
+import json
+import pygame
+from settings import *
+
+# Bump when the recording layout changes
+FORMAT_VERSION = 1
+
+# Every key Player reads; recordings only keep these
+GAME_KEYS = (
+    pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT,
+    pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d,
+    pygame.K_SPACE, pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4,
+    pygame.K_q, pygame.K_e,
+)
+
+
+class ScriptedKeys:
+    """Stands in for pygame.key.get_pressed(), holding a fixed set of keys."""
+    def __init__(self, pressed = ()):
+        self.pressed = set(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+
+class LiveInput:
+    """The keyboard and pygame's clock, as they were at the last step."""
+    def __init__(self):
+        self.keys = ScriptedKeys()
+        self.ticks = pygame.time.get_ticks()
+
+    def step(self):
+        self.keys = pygame.key.get_pressed()
+        self.ticks = pygame.time.get_ticks()
+
+
+class InputRecorder:
+    """Passes another source through and keeps the keys and ticks of every step."""
+    def __init__(self, source):
+        self.source = source
+        self.keys = source.keys
+        self.ticks = source.ticks
+        self.steps = []
+
+    def step(self):
+        self.source.step()
+        self.keys = self.source.keys
+        self.ticks = self.source.ticks
+        self.steps.append([self.ticks, [key for key in GAME_KEYS if self.keys[key]]])
+
+    def save(self, path):
+        recording = {'version': FORMAT_VERSION, 'sim_step': SIM_STEP, 'steps': self.steps}
+        with open(path, 'w') as recording_file:
+            json.dump(recording, recording_file, separators = (',', ':'))
+
+
+class InputReplay:
+    """Feeds a saved recording back one step at a time; no keys are held once it runs out."""
+    def __init__(self, path):
+        with open(path) as recording_file:
+            recording = json.load(recording_file)
+        if recording.get('version') != FORMAT_VERSION:
+            raise ValueError(f'{path} is a version {recording.get("version")} recording, expected {FORMAT_VERSION}')
+        if recording['sim_step'] != SIM_STEP:
+            raise ValueError(f'{path} was recorded with SIM_STEP {recording["sim_step"]}, not {SIM_STEP}')
+        self.steps = recording['steps']
+        self.index = 0
+        self.keys = ScriptedKeys()
+        self.ticks = self.steps[0][0] if self.steps else 0
+
+    @property
+    def finished(self):
+        return self.index >= len(self.steps)
+
+    def step(self):
+        if self.finished:
+            self.keys = ScriptedKeys()
+            return
+        self.ticks, pressed = self.steps[self.index]
+        self.keys = ScriptedKeys(pressed)
+        self.index += 1
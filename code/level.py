@@ -1,54 +1,104 @@
 import pygame
+from bisect import bisect_right
+from collections import OrderedDict
 from settings import *
-from tile import Tile
 from player import Player
 from debug import debug
 from support import *
 from random import choice
 from weapon import Weapon
+from sprite_pool import SpritePool
 from ui import UI
 from enemy import Enemy
+from enemy_system import EnemySystem
+from flow_field import FlowField
+from world_streamer import WorldStreamer, blit_tiled, chunk_range
+from spatial_hash import ObstacleGroup, SpatialGroup
+from static_tiles import StaticTiles
+from asset_cache import assets
+from atlas import atlas_sheets, load_atlas
+from profiler import profiler
+from map_compiler import load_map, MAP_LAYERS, MAP_CACHE, SPAWN_TYPES
+from tmx_loader import load_tmx, TileSurfaces
+from input_source import LiveInput
 
 class Level:
-    def __init__(self):
+    def __init__(self, map_layers = MAP_LAYERS, map_cache = MAP_CACHE, streaming = WORLD_STREAMING, tmx_map = TMX_MAP, input_source = None):
         # Get the display surface
         self.display_surface = pygame.display.get_surface()
 
-        # Sprite group setup
-        self.visible_sprites = YSortCameraGroup()
-        self.obstacle_sprites = pygame.sprite.Group()
+        self.map_layers = map_layers
+        self.map_cache = map_cache
+        self.tmx_map = tmx_map
+        self.streaming = streaming
+        self.streamer = None
+        # Keyboard and clock by default; a recorder or a replay can stand in
+        self.input_source = input_source or LiveInput()
+
+        # Decode every image the level starts with up front, on a thread pool
+        with profiler.section('asset_preload'):
+            assets.preload(self.startup_images())
+
+        # Player and monster frames come out of the packed atlas
+        with profiler.section('atlas_load'):
+            load_atlas()
+
+        # Sprite group setup; boundaries, grass and objects live in the shared tile store
+        self.static_tiles = StaticTiles()
+        self.visible_sprites = YSortCameraGroup(self.static_tiles)
+        self.obstacle_sprites = ObstacleGroup(tiles = self.static_tiles)
+        self.enemy_system = EnemySystem()
 
         #attack sprites
         self.current_attack = None
+        self.weapon_surfaces = {
+            (weapon, direction): assets.image(f'./graphics/weapons/{weapon}/{direction}.png')
+            for weapon in weapon_data
+            for direction in ('up', 'down', 'left', 'right')
+        }
+        # Weapon sprites are built once and reused for every attack
+        self.weapon_pool = SpritePool(lambda: Weapon([self.visible_sprites], self.weapon_surfaces), WEAPON_POOL_SIZE)
 
         # Initialize player as None
         self.player = None
 
         # Sprite creation
-        self.create_map()
+        with profiler.section('map_load'):
+            self.create_map()
+        self.enemy_system.flow_field = FlowField(self.obstacle_sprites, self.map_size, self.map_offset)
 
         #user interface
         self.ui = UI()
     
+    def startup_images(self):
+        """(path, alpha) of the images loaded while building the level and its UI."""
+        images = [] if self.streaming else [(FLOOR_IMAGE, False)]
+        images.extend((sheet, True) for sheet in atlas_sheets())
+        for folder in ('./graphics/grass', './graphics/objects'):
+            images.extend((path, True) for path in assets.folder_paths(folder))
+        images.extend((f'./graphics/weapons/{weapon}/{direction}.png', True)
+                      for weapon in weapon_data for direction in ('up', 'down', 'left', 'right'))
+        images.extend((weapon['graphic'], True) for weapon in weapon_data.values())
+        images.extend((magic['graphic'], True) for magic in magic_data.values())
+        images.append(('./graphics/player.png', True))
+        return images
+
     def create_map(self):
          
-         layouts = {
-             'boundary' : import_csv_layout('./graphics/TileMap/mappington_boundary_blocks.csv'),
-             'grass' : import_csv_layout('./graphics/TileMap/mappington_details.csv'),
-             'object' : import_csv_layout_raw('./graphics/TileMap/mappington_objects.csv'),
-             'enemy' : import_csv_layout_raw('./graphics/TileMap/mappington_entities.csv')
-         }
+         # A Tiled map when one is given, otherwise the CSV layers
+         compiled = load_tmx(self.tmx_map) if self.tmx_map else load_map(self.map_layers, self.map_cache)
          graphics = {
-             'grass' : import_folder('./graphics/Grass'),
-             'objects' : import_folder('./graphics/Objects'),
-             'enemies' : import_folder('./graphics/Monsters')
+             'grass' : import_folder('./graphics/grass'),
+             'objects' : import_folder('./graphics/objects'),
+             'enemies' : import_folder('./graphics/monsters')
          }
 
          # Map offset for centering
-         map_width_pixels = 2048
-         map_height_pixels = 2048
+         map_height_pixels, map_width_pixels = (size * TILESIZE for size in compiled['boundary'].shape)
          map_offset_x = -(map_width_pixels // 2)
          map_offset_y = -(map_height_pixels // 2)
+         self.map_size = compiled['boundary'].shape
+         self.map_offset = (map_offset_x, map_offset_y)
          
          # Build the object_surfaces dictionary at the start of create_map
          tiled_id_to_filename = {
@@ -65,108 +115,357 @@ class Level:
              10: '19.png',
              11: '18.png',
          }
-         self.object_surfaces = {}
-         for tiled_id, filename in tiled_id_to_filename.items():
-             full_path = f'./graphics/objects/{filename}'
-             surf = pygame.image.load(full_path).convert_alpha()
-             self.object_surfaces[tiled_id] = surf
-
-         for style, layout in layouts.items():
-            for row_index, row in enumerate(layout):
-                for col_index, col in enumerate(row):
-                    x = col_index * TILESIZE + map_offset_x
-                    y = row_index * TILESIZE + map_offset_y
-                    
-                    if style == 'boundary' and col == '395':
-                        Tile((x, y), [self.obstacle_sprites], 'invisible')
-                    elif style == 'grass' and col.strip() == '32':
-                        random_grass_img = choice(graphics['grass'])
-                        Tile((x, y), [self.visible_sprites, self.obstacle_sprites], 'grass', random_grass_img)
-                    elif style == 'object' and col != '-1':
-                        try:
-                            object_id = int(col)
-                            surf = self.object_surfaces.get(object_id)
-                            if surf:
-                                Tile((x, y), [self.visible_sprites, self.obstacle_sprites], 'object', surf)
-                        except ValueError:
-                            pass  # Ignore invalid values
-                    # Fixed: Changed 'entities' to 'enemy' to match the layout dictionary
-                    elif style == 'enemy':
-                        if col.strip() == '394':
-                            # Only create player if one doesn't exist yet
-                            if self.player is None:
-                                self.player = Player((x,y), [self.visible_sprites], self.obstacle_sprites, self.create_attack, self.destroy_attack, self.create_magic)
-                        elif col != '-1' and col.strip() != '':
-                            # Create enemy - you may need to map different col values to different monster types
-                            try:
-                                enemy_id = int(col)
-                                # Map enemy IDs to monster types
-                                enemy_types = {
-                                    390: 'bamboo',
-                                    391: 'spirit', 
-                                    392: 'raccoon',
-                                    393: 'squid'
-                                }
-                                monster_type = enemy_types.get(enemy_id, 'squid')  # Default to squid
-                                Enemy(monster_type, (x,y), [self.visible_sprites], self.obstacle_sprites)
-                                print(f"Created {monster_type} enemy at ({x}, {y})")  # Debug output
-                            except ValueError:
-                                # If it's not a number, might be a monster name directly
-                                if col.strip() in ['squid', 'raccoon', 'spirit', 'bamboo']:
-                                    Enemy(col.strip(), (x,y), [self.visible_sprites], self.obstacle_sprites)
-                                    print(f"Created {col.strip()} enemy at ({x}, {y})")  # Debug output
+         object_files = {tiled_id: f'./graphics/objects/{filename}' for tiled_id, filename in tiled_id_to_filename.items()}
+         if self.tmx_map:
+             # Tiled maps draw objects by GID, cut from the tilesets; the object tileset's
+             # sheet is not in the project, so its tiles fall back to the PNGs above
+             self.object_surfaces = TileSurfaces(compiled['tilesets'], {OBJECT_TILESET: object_files})
+             compiled['object_cells'] = compiled['object_gid_cells']
+         else:
+             self.object_surfaces = {tiled_id: assets.image(path) for tiled_id, path in object_files.items()}
+
+         def world_pos(col_index, row_index):
+             return (int(col_index) * TILESIZE + map_offset_x, int(row_index) * TILESIZE + map_offset_y)
+
+         self.grass_images = graphics['grass']
+         if self.streaming:
+             # Only the player is placed now, the chunks around it are built by the streamer
+             player_spawns = compiled['spawns'][compiled['spawns'][:, 2] == SPAWN_TYPES.index('player')]
+             if len(player_spawns):
+                 self.create_player(world_pos(*player_spawns[0, :2]))
+             else:
+                 print("No player found in map, creating fallback player at (0, 0)")
+                 self.create_player((0, 0))
+             self.streamer = WorldStreamer(self, compiled)
+             self.streamer.load_around(self.player.hitbox.center)
+             return
+
+         # Repeated over maps larger than the image, like the benchmark's scaled ones
+         self.visible_sprites.set_floor(assets.image(FLOOR_IMAGE, alpha = False), self.map_offset,
+                                        (map_width_pixels, map_height_pixels))
+
+         for col_index, row_index, width, height in compiled['boundary_rects']:
+             self.create_boundary(world_pos(col_index, row_index) + (int(width) * TILESIZE, int(height) * TILESIZE))
+
+         for col_index, row_index in compiled['grass_cells']:
+             self.create_grass(world_pos(col_index, row_index))
+
+         for col_index, row_index, object_id in compiled['object_cells']:
+             self.create_object(world_pos(col_index, row_index), object_id)
+
+         for col_index, row_index, spawn_type in compiled['spawns']:
+             x, y = world_pos(col_index, row_index)
+             monster_type = SPAWN_TYPES[spawn_type]
+             if monster_type == 'player':
+                 # Only create player if one doesn't exist yet
+                 if self.player is None:
+                     self.create_player((x,y))
+             else:
+                 self.create_enemy(monster_type, (x,y))
 
          # Only create fallback player if none was found in the map
          if self.player is None:
              print("No player found in map, creating fallback player at (0, 0)")
-             self.player = Player(
-                (0, 0),
-                [self.visible_sprites],
-                self.obstacle_sprites,
-                self.create_attack,
-                self.destroy_attack,
-                self.create_magic)
+             self.create_player((0, 0))
+
+    def create_boundary(self, rect):
+        # Merged walls keep the shared placeholder surface, only the collision rect grows
+        return self.static_tiles.add(rect[:2], [self.obstacle_sprites], 'invisible', size = rect[2:])
+
+    def create_grass(self, pos):
+        random_grass_img = choice(self.grass_images)
+        return self.static_tiles.add(pos, [self.visible_sprites, self.obstacle_sprites], 'grass', random_grass_img)
+
+    def create_object(self, pos, object_id):
+        surf = self.object_surfaces.get(int(object_id))
+        if surf:
+            return self.static_tiles.add(pos, [self.visible_sprites, self.obstacle_sprites], 'object', surf)
+
+    def create_enemy(self, monster_type, pos):
+        enemy = Enemy(monster_type, pos, [self.visible_sprites], self.obstacle_sprites, self.enemy_system)
+        print(f"Created {monster_type} enemy at ({pos[0]}, {pos[1]})")  # Debug output
+        return enemy
+
+    def create_player(self, pos):
+        self.player = Player(pos, [self.visible_sprites], self.obstacle_sprites, self.create_attack, self.destroy_attack, self.create_magic, self.input_source)
+
+    def obstacles_changed(self, rect):
+        # Streamed chunks add and remove obstacles after the flow field was built
+        if self.enemy_system.flow_field is not None:
+            self.enemy_system.flow_field.refresh_area(rect)
 
     def create_attack(self):
-        self.current_attack = Weapon(self.player,[self.visible_sprites])
+        if self.current_attack:
+            # A faster weapon can attack again before the last swing was cleared
+            self.weapon_pool.release(self.current_attack)
+        self.current_attack = self.weapon_pool.acquire(self.player)
     
     def create_magic(self,style,strength,cost):
         print(style,strength,cost)    
     def destroy_attack(self):
         if self.current_attack:
-            self.current_attack.kill()
+            self.weapon_pool.release(self.current_attack)
         self.current_attack = None
 
-    def run(self):
-       # Update and draw the game
-       self.visible_sprites.custom_draw(self.player)
-       self.visible_sprites.update()
-       self.ui.display(self.player)
+    def update(self, dt = SIM_STEP):
+       # Advance the simulation by one fixed step
+       self.input_source.step()
+       if self.streamer:
+           with profiler.section('streaming'):
+               self.streamer.update(self.player.hitbox.center)
+       with profiler.section('enemy_ai'):
+           self.enemy_system.update(self.player, dt)
+       with profiler.section('update'):
+           self.visible_sprites.update(dt)
+
+    def close(self):
+       # Stop the streamer's worker thread; the level is not used afterwards
+       if self.streamer:
+           self.streamer.close()
+
+    def draw(self, alpha = 1.0):
+       # alpha is how far the next simulation step is, for interpolating moving sprites
+       with profiler.section('custom_draw'):
+           self.visible_sprites.custom_draw(self.player, alpha)
+       with profiler.section('ui.display'):
+           self.ui.display(self.player)
+       profiler.draw_overlay(self.display_surface)
        # Basic debug info
        #debug(f"Player pos: ({int(self.player.rect.centerx)}, {int(self.player.rect.centery)})")
        #debug(f"Obstacles: {len(self.obstacle_sprites)}", 10, 40)
+       #debug(f"Drawn: {self.visible_sprites.drawn_count} Culled: {self.visible_sprites.culled_count}", 10, 70)
 
 
-class YSortCameraGroup(pygame.sprite.Group):
-    def __init__(self):
-        super().__init__()
+class YSortCameraGroup(SpatialGroup):
+    y_sorted = True
+
+    def __init__(self, tiles = None):
+        super().__init__(tiles = tiles)
         self.display_surface = pygame.display.get_surface()
         self.half_width = self.display_surface.get_size()[0] // 2
         self.half_height = self.display_surface.get_size()[1] // 2
         self.offset = pygame.math.Vector2()
 
-        self.floor_surf = pygame.image.load('./graphics/mappington.png').convert()
-        self.floor_rect = self.floor_surf.get_rect(topleft = (-1024, -1024))
+        # Viewport in world coordinates, widened so sprites slide in without popping
+        self.view_rect = self.display_surface.get_rect().inflate(CULL_MARGIN * 2, CULL_MARGIN * 2)
+        self.drawn_count = 0
+        self.culled_count = 0
+
+        # Static tiles near the camera, presorted by centery; rebuilt only when the
+        # camera crosses into other grid cells or tiles are added or removed
+        self.static_cache_key = None
+        self.static_sprites = []
+        self.static_keys = []
+
+        # The floor is either one image placed by set_floor, or streamed CHUNK_SIZE tiles
+        self.floor_surf = None
+        self.floor_rect = pygame.Rect(0, 0, 0, 0)
+        self.floor_tiles = {}
+
+        # Floor and static tiles baked into CHUNK_SIZE squares on first use
+        self.bake_static = STATIC_CHUNK_RENDERING
+        self.chunks = OrderedDict()
+        self.chunks_drawn = 0
     
-    def custom_draw(self, player):
+    def is_static(self, sprite):
+        # Static tiles live in the tile store; every sprite added (player, enemies, weapons) moves
+        return False
+
+    def static_changed(self, sprite):
+        # Only the baked chunks under a tile that came or went are stale
+        if sprite is None:
+            self.chunks.clear()
+        else:
+            self.drop_chunks(sprite.rect)
+
+    def drop_chunks(self, rect):
+        left, top, right, bottom = chunk_range(rect)
+        for chunk_y in range(top, bottom + 1):
+            for chunk_x in range(left, right + 1):
+                self.chunks.pop((chunk_x, chunk_y), None)
+
+    def set_floor(self, surface, topleft, size = None):
+        """Lay the floor image at topleft, repeated to cover size if that is larger."""
+        self.floor_surf = surface
+        self.floor_rect = pygame.Rect(topleft, size or surface.get_size())
+        self.chunks.clear()
+
+    def set_floor_tile(self, chunk, surface):
+        """Add or, with surface None, drop the streamed floor tile of a chunk."""
+        if surface is None:
+            self.floor_tiles.pop(chunk, None)
+        else:
+            self.floor_tiles[chunk] = surface
+        self.chunks.pop(chunk, None)
+
+    def draw_floor(self, surface, origin):
+        """Paint the floor on surface, whose top left corner is at world position origin."""
+        if self.floor_surf is not None:
+            blit_tiled(surface, self.floor_surf, self.floor_rect, origin)
+        if self.floor_tiles:
+            left, top, right, bottom = chunk_range(surface.get_clip().move(origin[0], origin[1]))
+            for chunk_y in range(top, bottom + 1):
+                for chunk_x in range(left, right + 1):
+                    tile = self.floor_tiles.get((chunk_x, chunk_y))
+                    if tile is not None:
+                        surface.blit(tile, (chunk_x * CHUNK_SIZE - origin[0], chunk_y * CHUNK_SIZE - origin[1]))
+
+    def static_in_view(self):
+        cells = self.spatial_hash.cell_range(self.view_rect)
+        cache_key = (cells[0], cells[-1], self.version)
+        if cache_key != self.static_cache_key:
+            self.static_cache_key = cache_key
+            self.static_sprites = self.static_query(self.view_rect)
+            self.static_keys = [sprite.rect.centery for sprite in self.static_sprites]
+        return self.static_sprites, self.static_keys
+
+    def draw_order(self):
+        """Merge the few moving sprites into the presorted static tiles."""
+        if self.pending:
+            self.flush()
+        static_sprites, static_keys = self.static_in_view()
+        view_rect = self.view_rect
+        moving = sorted((sprite for sprite in self.moving if view_rect.colliderect(sprite.rect)),
+                        key = lambda sprite: sprite.rect.centery)
+
+        ordered = []
+        start = 0
+        for sprite in moving:
+            index = bisect_right(static_keys, sprite.rect.centery, start)
+            ordered.extend(static_sprites[start:index])
+            ordered.append(sprite)
+            start = index
+        ordered.extend(static_sprites[start:])
+        return ordered
+
+    def count_drawn(self, drawn):
+        """Record the sprites and tiles on screen this frame, each counted once, and
+        the ones culled for being off screen; hidden sprites are in neither."""
+        self.drawn_count = drawn
+        self.culled_count = len(self.moving) + len(self.spatial_hash) + self.tile_count() - drawn
+
+    def get_chunk(self, chunk):
+        """Return the baked surface for a chunk, building it if it is not cached."""
+        surf = self.chunks.get(chunk)
+        if surf is not None:
+            self.chunks.move_to_end(chunk)
+            return surf
+
+        chunk_rect = pygame.Rect(chunk[0] * CHUNK_SIZE, chunk[1] * CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE)
+        surf = pygame.Surface(chunk_rect.size).convert()
+        surf.fill('black')
+        self.draw_floor(surf, chunk_rect.topleft)
+        for sprite in self.static_query(chunk_rect):
+            rect = sprite.rect
+            surf.blit(sprite.image, (rect.x - chunk_rect.x, rect.y - chunk_rect.y))
+
+        self.chunks[chunk] = surf
+        if len(self.chunks) > CHUNK_CACHE_SIZE:
+            self.chunks.popitem(last = False)
+        return surf
+
+    def draw_baked(self):
+        if self.pending:
+            self.flush()
+
+        # Floor and static tiles come from the chunk surfaces
+        screen_rect = self.display_surface.get_rect(topleft = (int(self.offset.x), int(self.offset.y)))
+        left, top = screen_rect.left // CHUNK_SIZE, screen_rect.top // CHUNK_SIZE
+        right, bottom = (screen_rect.right - 1) // CHUNK_SIZE, (screen_rect.bottom - 1) // CHUNK_SIZE
+        chunks_drawn = 0
+        for chunk_y in range(top, bottom + 1):
+            for chunk_x in range(left, right + 1):
+                chunk_pos = (chunk_x * CHUNK_SIZE - self.offset.x, chunk_y * CHUNK_SIZE - self.offset.y)
+                self.display_surface.blit(self.get_chunk((chunk_x, chunk_y)), chunk_pos)
+                chunks_drawn += 1
+        self.chunks_drawn = chunks_drawn
+
+        # Moving sprites go straight on top in Y order. Where a tile should be in
+        # front of one, that sprite's area is repainted from the floor up with the
+        # tiles and moving sprites overlapping it in Y order, clipped to that area
+        view_rect = self.view_rect
+        moving = sorted((sprite for sprite in self.moving if view_rect.colliderect(sprite.rect)),
+                        key = lambda sprite: sprite.rect.centery)
+        moving_rects = [sprite.rect for sprite in moving]
+        occluded = []
+        for sprite in moving:
+            self.display_surface.blit(sprite.image, sprite.rect.topleft - self.offset)
+            tiles = self.static_query(sprite.rect)
+            if any(tile.rect.centery > sprite.rect.centery for tile in tiles):
+                occluded.append((sprite, tiles))
+
+        for sprite, tiles in occluded:
+            area = sprite.rect
+            self.display_surface.set_clip(area.move(-self.offset.x, -self.offset.y))
+            self.display_surface.fill('black')
+            self.draw_floor(self.display_surface, self.offset)
+
+            layers = [(tile.rect.centery, 0, tile) for tile in tiles]
+            layers.extend((moving[index].rect.centery, 1, moving[index]) for index in area.collidelistall(moving_rects))
+            layers.sort(key = lambda layer: layer[:2])
+            for _, _, layer in layers:
+                self.display_surface.blit(layer.image, layer.rect.topleft - self.offset)
+        self.display_surface.set_clip(None)
+
+        # Tiles in view were drawn through their chunk; repainting an occluded sprite's area does not count again
+        static_sprites, _ = self.static_in_view()
+        self.count_drawn(len(moving) + sum(1 for sprite in static_sprites if view_rect.colliderect(sprite.rect)))
+
+    def update(self, *args):
+        # Tiles never update, and parked (asleep) enemies are hidden, so they are skipped
+        if self.pending:
+            self.flush()
+        awake = list(self.moving)
+        for sprite in awake:
+            # Remember where moving sprites were, so drawing can interpolate between steps
+            if hasattr(sprite, 'hitbox'):
+                sprite.previous_center = sprite.hitbox.center
+        for sprite in awake:
+            sprite.update(*args)
+
+    def interpolate(self, alpha):
+        """Move entity rects between their previous and current step; returns what to restore."""
+        moved = []
+        if alpha >= 1:
+            return moved
+        for sprite in self.moving:
+            previous = getattr(sprite, 'previous_center', None)
+            if previous is None:
+                continue
+            shift_x = round((previous[0] - sprite.hitbox.centerx) * (1 - alpha))
+            shift_y = round((previous[1] - sprite.hitbox.centery) * (1 - alpha))
+            if shift_x or shift_y:
+                moved.append((sprite, sprite.rect.topleft))
+                sprite.rect.move_ip(shift_x, shift_y)
+        return moved
+
+    def custom_draw(self, player, alpha = 1.0):
+        if self.pending:
+            self.flush()
+        moved = self.interpolate(alpha)
+        self.draw_sprites(player)
+        for sprite, topleft in moved:
+            sprite.rect.topleft = topleft
+
+    def draw_sprites(self, player):
         self.offset.x = player.rect.centerx - self.half_width
         self.offset.y = player.rect.centery - self.half_height
+        self.view_rect.center = player.rect.center
+
+        if self.bake_static:
+            self.draw_baked()
+            return
 
-        floor_offset_pos = self.floor_rect.topleft - self.offset
-        self.display_surface.blit(self.floor_surf, floor_offset_pos)
+        self.draw_floor(self.display_surface, self.offset)
 
-        for sprite in sorted(self.sprites(), key = lambda sprite: sprite.rect.centery):
-            offset_pos = sprite.rect.topleft - self.offset
-            self.display_surface.blit(sprite.image, offset_pos)
+        # Only sprites overlapping the viewport are drawn, already in Y order
+        view_rect = self.view_rect
+        drawn = 0
+        for sprite in self.draw_order():
+            if view_rect.colliderect(sprite.rect):
+                offset_pos = sprite.rect.topleft - self.offset
+                self.display_surface.blit(sprite.image, offset_pos)
+                drawn += 1
+        self.count_drawn(drawn)
             
         # Draw debug info if enabled
\ No newline at end of file
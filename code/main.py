@@ -1,28 +1,78 @@
-import pygame, sys
+import argparse
+import pygame, sys, time
 from settings import *
 from debug import debug
 from level import Level
+from profiler import profiler
+from input_source import LiveInput, InputRecorder, InputReplay
 
 class Game:
-    def __init__(self):
+    def __init__(self, record = None, replay = None):
+        self.start_time = time.perf_counter()
         pygame.init()
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption('Everdusk')
         self.clock = pygame.time.Clock()
-        self.level = Level()
+        self.record_path = record
+        if replay:
+            self.input_source = InputReplay(replay)
+        elif record:
+            self.input_source = InputRecorder(LiveInput())
+        else:
+            self.input_source = LiveInput()
+        self.level = Level(input_source = self.input_source)
+
+    def quit(self):
+        self.level.close()
+        if self.record_path:
+            self.input_source.save(self.record_path)
+            print(f'Recorded {len(self.input_source.steps)} steps to {self.record_path}')
+        pygame.quit()
+        sys.exit()
     
     def run(self):
-        
+        # Fixed-step simulation: the level advances in SIM_STEP steps however long a rendered frame takes
+        previous_time = time.perf_counter()
+        accumulator = 0.0
+        first_frame = True
         while True:
             for event in pygame.event.get(): 
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+                    self.quit()
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    # F3 toggles the profiler and its overlay
+                    profiler.enabled = not profiler.enabled
+                    profiler.show_overlay = profiler.enabled
+
+            now = time.perf_counter()
+            accumulator += now - previous_time
+            previous_time = now
+            steps = 0
+            while accumulator >= SIM_STEP and steps < MAX_SIM_STEPS:
+                self.level.update(SIM_STEP)
+                accumulator -= SIM_STEP
+                steps += 1
+            if getattr(self.input_source, 'finished', False):
+                # The replay ran out of recorded steps
+                self.quit()
+            if steps == MAX_SIM_STEPS:
+                # Too far behind to catch up, drop the backlog instead of spiralling
+                accumulator = min(accumulator, SIM_STEP)
+
             self.screen.fill('black')
-            self.level.run()
+            self.level.draw(accumulator / SIM_STEP)
             pygame.display.update()
+            if first_frame:
+                # Shown on the F3 overlay and in profiler exports
+                profiler.mark('first_frame', time.perf_counter() - self.start_time)
+                first_frame = False
+            profiler.end_frame()
             self.clock.tick(FPS)
 
 if __name__ == '__main__':
-    game = Game()
-    game.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description = 'Everdusk')
+    parser.add_argument('--record', metavar = 'FILE', help = 'save the keys and clock of every simulation step to FILE on quit')
+    parser.add_argument('--replay', metavar = 'FILE', help = 'play back a recording made with --record instead of reading the keyboard')
+    args = parser.parse_args()
+    game = Game(args.record, args.replay)
+    game.run()
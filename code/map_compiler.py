@@ -0,0 +1,168 @@
+"""Compile the CSV map layers into one binary file that Level.create_map can load.
+
+Run from the project root to (re)build the shipped map:  python code/map_compiler.py
+"""
+import hashlib
+import os
+import numpy as np
+from support import import_csv_array
+
+# Bump when the compiled layout changes so stale files are rebuilt
+FORMAT_VERSION = 3
+
+MAP_LAYERS = {
+    'boundary': './graphics/TileMap/mappington_boundary_blocks.csv',
+    'grass': './graphics/TileMap/mappington_details.csv',
+    'object': './graphics/TileMap/mappington_objects.csv',
+    'enemy': './graphics/TileMap/mappington_entities.csv',
+}
+MAP_CACHE = './graphics/TileMap/mappington.compiled.npz'
+
+# Index stored in the spawn list; 0 is the player
+SPAWN_TYPES = ('player', 'squid', 'raccoon', 'spirit', 'bamboo')
+ENEMY_IDS = {390: 'bamboo', 391: 'spirit', 392: 'raccoon', 393: 'squid'}
+
+
+def layers_hash(layer_paths):
+    digest = hashlib.sha1(str(FORMAT_VERSION).encode())
+    for name in sorted(layer_paths):
+        digest.update(name.encode())
+        with open(layer_paths[name], 'rb') as layer_file:
+            digest.update(layer_file.read())
+    return digest.hexdigest()
+
+
+def compact(array):
+    """Store layers as int16 when every value fits."""
+    if array.size and array.min() >= np.iinfo(np.int16).min and array.max() <= np.iinfo(np.int16).max:
+        return array.astype(np.int16)
+    return array
+
+
+def cells(mask):
+    """(col, row) of every set cell, in row-major order."""
+    rows, cols = np.nonzero(mask)
+    return np.stack([cols, rows], axis = 1).astype(np.int32)
+
+
+def merge_rects(mask):
+    """Greedily cover the set cells of a mask with maximal (col, row, width, height) rectangles.
+
+    Each rectangle grows right as far as it can, then down while the whole row
+    below is free, so no cell is covered twice.
+    """
+    todo = mask.copy()
+    rows, cols = todo.shape
+    rects = []
+    for row, col in zip(*np.nonzero(mask)):
+        if not todo[row, col]:
+            continue
+        width = 1
+        while col + width < cols and todo[row, col + width]:
+            width += 1
+        height = 1
+        while row + height < rows and todo[row + height, col:col + width].all():
+            height += 1
+        todo[row:row + height, col:col + width] = False
+        rects.append((col, row, width, height))
+    return np.array(rects, dtype = np.int32).reshape(-1, 4)
+
+
+def merge_irregular(found, extra):
+    """Add (col, row, value) entries from irregular cells and restore row-major order."""
+    if not extra:
+        return found
+    merged = np.concatenate([found, np.array(extra, dtype = np.int32)])
+    return merged[np.lexsort((merged[:, 0], merged[:, 1]))]
+
+
+def compile_layers(layer_paths):
+    """Parse the CSV layers and precompute everything create_map needs."""
+    boundary, _ = import_csv_array(layer_paths['boundary'])
+    grass, _ = import_csv_array(layer_paths['grass'])
+    objects, object_irregular = import_csv_array(layer_paths['object'], raw = True)
+    entities, entity_irregular = import_csv_array(layer_paths['enemy'], raw = True)
+    return classify_layers(boundary, grass, objects, entities, object_irregular, entity_irregular)
+
+
+def classify_layers(boundary, grass, objects, entities, object_irregular = None, entity_irregular = None):
+    """Turn tile id layers (-1 for empty) into what create_map needs.
+
+    Positions are in tiles, as (col, row). Boundaries are stored as rectangles
+    (col, row, width, height), with neighbouring cells merged. Cells are
+    classified with array masks; only cells that are not plain integers go
+    through the per-cell string rules.
+    """
+    # Irregular stripped cells can never read '395' or '32', so the masks cover them
+    boundary_rects = merge_rects(boundary == 395)
+    grass_cells = cells(grass == 32)
+
+    object_mask = objects != -1
+    object_cells = np.concatenate([cells(object_mask), objects[object_mask].reshape(-1, 1)], axis = 1)
+    extra = []
+    for (row_index, col_index), col in (object_irregular or {}).items():
+        if col != '-1':
+            try:
+                extra.append((col_index, row_index, int(col)))
+            except ValueError:
+                pass  # Ignore invalid values
+    object_cells = merge_irregular(object_cells, extra)
+
+    # Every other number maps to a squid, like the per-cell loader did
+    spawn_mask = entities != -1
+    spawn_types = np.full(entities.shape, SPAWN_TYPES.index('squid'), dtype = np.int32)
+    for enemy_id, monster_type in ENEMY_IDS.items():
+        spawn_types[entities == enemy_id] = SPAWN_TYPES.index(monster_type)
+    spawn_types[entities == 394] = SPAWN_TYPES.index('player')
+    spawns = np.concatenate([cells(spawn_mask), spawn_types[spawn_mask].reshape(-1, 1)], axis = 1)
+    extra = []
+    for (row_index, col_index), col in (entity_irregular or {}).items():
+        if col.strip() == '394':
+            extra.append((col_index, row_index, SPAWN_TYPES.index('player')))
+        elif col != '-1' and col.strip() != '':
+            try:
+                monster_type = ENEMY_IDS.get(int(col), 'squid')  # Default to squid
+            except ValueError:
+                # If it's not a number, might be a monster name directly
+                monster_type = col.strip()
+            if monster_type in SPAWN_TYPES[1:]:
+                extra.append((col_index, row_index, SPAWN_TYPES.index(monster_type)))
+    spawns = merge_irregular(spawns, extra)
+
+    return {
+        'boundary': compact(boundary),
+        'grass': compact(grass),
+        'object': compact(objects),
+        'enemy': compact(entities),
+        'boundary_rects': boundary_rects,
+        'grass_cells': grass_cells,
+        'object_cells': object_cells,
+        'spawns': spawns,
+    }
+
+
+def compile_map(layer_paths = MAP_LAYERS, cache_path = MAP_CACHE):
+    compiled = compile_layers(layer_paths)
+    compiled['source_hash'] = np.array(layers_hash(layer_paths))
+    with open(cache_path, 'wb') as cache_file:
+        np.savez(cache_file, **compiled)
+    return compiled
+
+
+def load_map(layer_paths = MAP_LAYERS, cache_path = MAP_CACHE):
+    """Load the compiled map, rebuilding it when it is missing or the CSVs have changed."""
+    source_hash = layers_hash(layer_paths)
+    if os.path.exists(cache_path):
+        try:
+            with np.load(cache_path) as cached:
+                if str(cached['source_hash']) == source_hash:
+                    return {name: cached[name] for name in cached.files}
+        except (OSError, ValueError, KeyError):
+            pass  # Unreadable or outdated file, rebuild it below
+    return compile_map(layer_paths, cache_path)
+
+
+if __name__ == '__main__':
+    compiled = compile_map()
+    print(f'Compiled {len(compiled["boundary_rects"])} boundaries, {len(compiled["grass_cells"])} grass, '
+          f'{len(compiled["object_cells"])} objects, {len(compiled["spawns"])} spawns to {MAP_CACHE}')
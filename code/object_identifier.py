@@ -1,3 +1,5 @@
+import numpy as np
+
 class ObjectIdentifier:
     def __init__(self):
         # Multi-tile object mapping (top-left, top-right, bottom-left, bottom-right) -> object index
@@ -58,6 +60,53 @@ class ObjectIdentifier:
             
         return None, None
     
+    def find_objects(self, layout):
+        """
+        Find every 2x2 object in a whole integer layout (a 2D array, -1 for empty) at once.
+        Returns an (N, 3) int array of (row, col, object_index), top-left corners in row-major order.
+
+        Gives the same matches as reset() followed by get_object_at_position() and
+        mark_positions_processed() on every cell in row-major order: a match is
+        dropped when its top-left cell belongs to an earlier match, and cells past
+        the edge of the layout read as -1. processed_positions is left untouched.
+        """
+        layout = np.asarray(layout, dtype = np.int64)
+        rows, cols = layout.shape
+        padded = np.full((rows + 1, cols + 1), -1, dtype = np.int64)
+        padded[:rows, :cols] = layout
+        corners = (padded[:-1, :-1], padded[:-1, 1:], padded[1:, :-1], padded[1:, 1:])
+
+        # Each 2x2 window has one pattern, so it matches at most one object
+        matched = np.zeros((rows, cols), dtype = bool)
+        object_indices = np.zeros((rows, cols), dtype = np.int64)
+        for pattern, object_index in self.multi_tile_objects.items():
+            if pattern[0] == -1:
+                # The scan never starts a match on an empty cell
+                continue
+            hit = (corners[0] == pattern[0]) & (corners[1] == pattern[1]) & (corners[2] == pattern[2]) & (corners[3] == pattern[3])
+            matched |= hit
+            object_indices[hit] = object_index
+
+        match_rows, match_cols = np.nonzero(matched)
+        found = np.stack([match_rows, match_cols, object_indices[match_rows, match_cols]], axis = 1)
+
+        # A match can only lose its top-left cell to one directly left, above or up-left of it
+        claimable = np.zeros((rows + 1, cols + 1), dtype = bool)
+        claimable[1:, 1:] = matched
+        contested = claimable[1:, :-1] | claimable[:-1, 1:] | claimable[:-1, :-1]
+        if not contested[match_rows, match_cols].any():
+            return found
+
+        # Resolve the few touching matches in scan order
+        claimed = set()
+        kept = []
+        for index, (row, col) in enumerate(zip(match_rows.tolist(), match_cols.tolist())):
+            if (row, col) in claimed:
+                continue
+            claimed.update(((row, col + 1), (row + 1, col), (row + 1, col + 1)))
+            kept.append(index)
+        return found[kept]
+
     def mark_positions_processed(self, positions):
         """Mark a list of positions as processed to avoid duplicates."""
         if positions:
@@ -1,14 +1,16 @@
 import pygame
 from settings import *
 from support import import_folder
+from asset_cache import assets
+from profiler import profiler
 from enemy import Enemy
 from entity import Entity
 
 class Player(Entity):
-    def __init__(self, pos, groups, obstacle_sprites, create_attack, destroy_attack, create_magic):
+    def __init__(self, pos, groups, obstacle_sprites, create_attack, destroy_attack, create_magic, input_source):
         
         super().__init__(groups)
-        self.image = pygame.image.load('./graphics/player.png').convert_alpha()
+        self.image = assets.image('./graphics/player.png')
         self.rect = self.image.get_rect(topleft = pos)
 
         self.hitbox = self.rect.inflate(0, -26) # Custom hitbox for better visual overlap
@@ -20,6 +22,8 @@ class Player(Entity):
 
         # Movement
         self.obstacle_sprites = obstacle_sprites
+        # Keys and clock, sampled once per simulation step by the level
+        self.input_source = input_source
         
 
         #weapons
@@ -44,7 +48,8 @@ class Player(Entity):
             'flame': 10000,
             'heal': 20000,
         }
-        self.last_magic_cast = {name: 0 for name in self.magic_list}
+        # Every spell and ability starts ready, whatever the input clock reads at the start
+        self.last_magic_cast = {name: input_source.ticks - self.magic_cooldowns.get(name, 1000) for name in self.magic_list}
 
         #stats
         self.stats = {'health': 100, 'energy': 60, 'attack': 10, 'magic_multiplier': 3, 'speed': 5}
@@ -62,7 +67,7 @@ class Player(Entity):
             'magic3': 200,
             'magic4': 2000
         }
-        self.last_ability_use = {ability: 0 for ability in self.ability_cooldowns.keys()}
+        self.last_ability_use = {ability: input_source.ticks - cooldown for ability, cooldown in self.ability_cooldowns.items()}
         self.active_ability = None
 
         # Debug toggle
@@ -80,7 +85,7 @@ class Player(Entity):
     
     def get_remaining_cooldown(self, ability_name):
         """Get remaining cooldown time for an ability or magic"""
-        current_time = pygame.time.get_ticks()
+        current_time = self.input_source.ticks
 
         # check ability cooldowns
         if ability_name in self.ability_cooldowns:
@@ -97,13 +102,13 @@ class Player(Entity):
     
     def can_use_ability(self, ability_name):
         """Check if an ability is off cooldown"""
-        current_time = pygame.time.get_ticks()
+        current_time = self.input_source.ticks
         return current_time - self.last_ability_use[ability_name] >= self.ability_cooldowns[ability_name]
 
     def use_ability(self, ability_name):
         """Use an ability and start its cooldown"""
         if self.can_use_ability(ability_name):
-            self.last_ability_use[ability_name] = pygame.time.get_ticks()
+            self.last_ability_use[ability_name] = self.input_source.ticks
             self.active_ability = ability_name
             print(f'{ability_name} used!')
             return True
@@ -114,7 +119,7 @@ class Player(Entity):
 
 
     def input(self):
-        keys = pygame.key.get_pressed()
+        keys = self.input_source.keys
         if not self.active_ability:
             # Movement
             if keys[pygame.K_UP] or keys[pygame.K_w]:
@@ -155,12 +160,12 @@ class Player(Entity):
                 # switch selection only if allowed
                 if self.can_switch_magic and self.magic_index != target_index:
                     self.can_switch_magic = False
-                    self.magic_switch_time = pygame.time.get_ticks()
+                    self.magic_switch_time = self.input_source.ticks
                     self.magic_index = target_index
                     self.magic = self.magic_list[self.magic_index]
 
                 # cast currently selected magic respecting per-spell cooldowns
-                now = pygame.time.get_ticks()
+                now = self.input_source.ticks
                 spell = self.magic
                 cooldown = self.magic_cooldowns.get(spell, 1000)
                 if now - self.last_magic_cast[spell] >= cooldown:
@@ -172,14 +177,14 @@ class Player(Entity):
         weapon_list = list(weapon_data.keys())
         if keys[pygame.K_q] and self.can_switch_weapon:
             self.can_switch_weapon = False
-            self.weapon_switch_time = pygame.time.get_ticks()
+            self.weapon_switch_time = self.input_source.ticks
             self.weapon_index = (self.weapon_index + 1) % len(weapon_list)
             self.weapon = weapon_list[self.weapon_index]
 
 
         if keys[pygame.K_e] and self.can_switch_weapon:
             self.can_switch_weapon = False
-            self.weapon_switch_time = pygame.time.get_ticks()
+            self.weapon_switch_time = self.input_source.ticks
             self.weapon_index = (self.weapon_index - 1) % len(weapon_list)
             self.weapon = weapon_list[self.weapon_index]
 
@@ -210,7 +215,7 @@ class Player(Entity):
             pygame.draw.rect(surface, 'green', player_rect, 2)
             
             # Draw nearby obstacle hitboxes
-            for sprite in self.obstacle_sprites:
+            for sprite in self.obstacle_sprites.nearby(self.hitbox, 200):
                 # Only draw obstacles near the player
                 distance = pygame.math.Vector2(sprite.rect.center) - pygame.math.Vector2(self.rect.center)
                 if distance.magnitude() < 200:  # Within 200 pixels
@@ -218,7 +223,7 @@ class Player(Entity):
 
     def cooldowns(self):
         """Update ability cooldowns and clear active ability after effect duration"""
-        current_time = pygame.time.get_ticks()
+        current_time = self.input_source.ticks
 
         if self.active_ability:
             effect_duration = 200  # 200ms effect duration
@@ -233,10 +238,10 @@ class Player(Entity):
             if current_time - self.magic_switch_time >= self.switch_delay:
                 self.can_switch_magic = True
     
-    def animate(self):
+    def animate(self, dt = SIM_STEP):
         """Update player animation"""
         animation = self.animations[self.status]
-        self.frame_index += self.animation_speed
+        self.frame_index += self.animation_speed * dt * FPS
         
         if self.frame_index >= len(animation):
             self.frame_index = 0
@@ -245,9 +250,10 @@ class Player(Entity):
         self.image = animation[int(self.frame_index)]
         self.rect = self.image.get_rect(center=self.hitbox.center)
     
-    def update(self):
-        self.input()
+    def update(self, dt = SIM_STEP):
+        with profiler.section('player.input'):
+            self.input()
         self.cooldowns()
         self.get_status()
-        self.animate()
-        self.move(self.speed)
\ No newline at end of file
+        self.animate(dt)
+        self.move(self.speed, dt)
\ No newline at end of file
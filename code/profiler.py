@@ -0,0 +1,137 @@
+import csv
+import json
+import time
+from collections import defaultdict, deque
+from contextlib import nullcontext
+import pygame
+from settings import *
+
+class Section:
+    """Times one block and adds the elapsed seconds to the profiler's current frame."""
+    def __init__(self, totals, name):
+        self.totals = totals
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.totals[self.name] += time.perf_counter() - self.start
+
+
+class Profiler:
+    """Scoped timers summed per frame, with a rolling history per section.
+
+    Wrap code in `with profiler.section('name'):` and call end_frame() once per
+    frame. While disabled, section() hands back a shared no-op context.
+    One-off timings such as startup go through mark(), which records them even
+    while disabled, so turning the profiler on later still shows them.
+    """
+    def __init__(self, enabled = PROFILER_ENABLED, history = PROFILER_HISTORY):
+        self.enabled = enabled
+        self.history_length = history
+        self.show_overlay = False
+        self.totals = defaultdict(float)
+        self.histories = {}
+        self.marks = {}
+        self.frame_count = 0
+        self.disabled_section = nullcontext()
+        self.font = None
+
+    def section(self, name):
+        if not self.enabled:
+            return self.disabled_section
+        return Section(self.totals, name)
+
+    def mark(self, name, seconds):
+        """Record a one-off timing, shown under the overlay graphs and exported with them."""
+        self.marks[name] = seconds
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        for name, history in self.histories.items():
+            history.append(self.totals.pop(name, 0.0))
+        for name, total in self.totals.items():
+            history = self.histories[name] = deque([0.0] * min(self.frame_count, self.history_length), self.history_length)
+            history.append(total)
+        self.totals.clear()
+        self.frame_count += 1
+
+    def reset(self):
+        self.totals.clear()
+        self.histories.clear()
+        self.marks.clear()
+        self.frame_count = 0
+
+    def summary(self):
+        """Mean, max and last frame time per section, in milliseconds."""
+        stats = {}
+        for name, history in self.histories.items():
+            stats[name] = {
+                'mean_ms': sum(history) / len(history) * 1000,
+                'max_ms': max(history) * 1000,
+                'last_ms': history[-1] * 1000,
+            }
+        return stats
+
+    def export_json(self, path):
+        data = {
+            'frames': self.frame_count,
+            'summary': self.summary(),
+            'marks_ms': {name: value * 1000 for name, value in self.marks.items()},
+            'history_ms': {name: [value * 1000 for value in history] for name, history in self.histories.items()},
+        }
+        with open(path, 'w') as export_file:
+            json.dump(data, export_file, indent = 2)
+
+    def export_csv(self, path):
+        """One row per frame in the history, one column per section, then one per mark."""
+        names = sorted(self.histories)
+        marks = sorted(self.marks)
+        length = max((len(history) for history in self.histories.values()), default = 0)
+        with open(path, 'w', newline = '') as export_file:
+            writer = csv.writer(export_file)
+            writer.writerow(['frame'] + [f'{name}_ms' for name in names] + [f'{name}_ms' for name in marks])
+            first_frame = self.frame_count - length
+            for index in range(length):
+                row = [first_frame + index]
+                for name in names:
+                    history = self.histories[name]
+                    offset = index - (length - len(history))
+                    row.append(f'{history[offset] * 1000:.4f}' if offset >= 0 else '')
+                # Marks are not per frame, every row repeats them
+                row.extend(f'{self.marks[name] * 1000:.4f}' for name in marks)
+                writer.writerow(row)
+
+    def draw_overlay(self, surface):
+        """Rolling graph per section, scaled so the top of each graph is one 60 FPS frame."""
+        if not (self.enabled and self.show_overlay and (self.histories or self.marks)):
+            return
+        if self.font is None:
+            self.font = pygame.font.Font(None, 18)
+
+        graph_width = self.history_length
+        graph_height = 30
+        budget = 1 / FPS
+        left = surface.get_width() - graph_width - 10
+        top = 10
+        for name in sorted(self.histories):
+            history = self.histories[name]
+            bg_rect = pygame.Rect(left, top, graph_width, graph_height)
+            pygame.draw.rect(surface, UI_BG_COLOR, bg_rect)
+            if len(history) > 1:
+                start = graph_width - len(history)
+                points = [(left + start + index, bg_rect.bottom - min(value / budget, 1) * graph_height)
+                          for index, value in enumerate(history)]
+                pygame.draw.lines(surface, 'gold', False, points)
+            label = self.font.render(f'{name} {history[-1] * 1000:.2f}ms', True, TEXT_COLOR)
+            surface.blit(label, (left + 3, top + 2))
+            top += graph_height + 4
+        for name in sorted(self.marks):
+            label = self.font.render(f'{name} {self.marks[name] * 1000:.0f}ms', True, TEXT_COLOR)
+            surface.blit(label, (left + 3, top))
+            top += label.get_height() + 4
+
+
+profiler = Profiler()
@@ -4,6 +4,51 @@ HEIGHT = 720
 FPS = 60
 TILESIZE = 32
 
+#simulation
+SIM_STEP = 1 / FPS  # fixed simulation timestep in seconds; speeds are in pixels per 1/FPS seconds
+MAX_SIM_STEPS = 5  # steps per rendered frame before the simulation is allowed to fall behind
+
+#spatial indexing
+SPATIAL_CELL_SIZE = 128
+CULL_MARGIN = 64  # extra pixels drawn around the screen edge
+
+#activity regions
+ACTIVITY_RADIUS = 1000  # enemies further than this from the camera are parked; keep above every notice_radius and off screen
+ACTIVITY_CELL_SIZE = 256  # grid cell of the enemy system's spatial hash
+
+#enemy pathfinding
+FLOW_FIELD_RADIUS = 16  # tiles searched around the player, beyond every notice_radius
+
+#static layer baking
+STATIC_CHUNK_RENDERING = True
+CHUNK_SIZE = 512
+CHUNK_CACHE_SIZE = 24  # baked chunks kept in memory, least recently used dropped first
+
+#map source
+TMX_MAP = None  # a Tiled .tmx map to load instead of the CSV layers, e.g. './graphics/TileMap/mappington.tmx'
+OBJECT_TILESET = 'spritesheet (3)'  # tileset whose missing sheet the graphics/objects PNGs stand in for
+
+#world streaming
+WORLD_STREAMING = False  # load the map in CHUNK_SIZE chunks around the player instead of all at once
+STREAM_RADIUS = 2  # chunks kept loaded on each side of the player's chunk; keep CHUNK_SIZE * STREAM_RADIUS above ACTIVITY_RADIUS
+FLOOR_IMAGE = './graphics/mappington.png'
+FLOOR_CHUNK_FOLDER = './graphics/TileMap/floor_chunks'  # FLOOR_IMAGE cut into CHUNK_SIZE tiles for streaming
+
+
+#sprite pools
+WEAPON_POOL_SIZE = 2  # weapon sprites built up front
+
+#asset loading
+ASSET_LOAD_WORKERS = 4  # threads decoding images at startup
+
+#texture atlas
+ATLAS_FOLDERS = ('./graphics/player', './graphics/monsters')  # animation frames packed into the atlas
+ATLAS_INDEX = './graphics/atlas/characters.json'
+ATLAS_SHEET_SIZE = 1024
+
+#profiling
+PROFILER_ENABLED = False
+PROFILER_HISTORY = 240  # frames kept per section
 
 #ui
 BAR_HEIGHT = 20
@@ -12,6 +57,8 @@ ENERGY_BAR_WIDTH = 140
 ITEM_BOX_SIZE = 80
 UI_FONT = './graphics/font/joystix.ttf'
 UI_FONT_SIZE = 18
+UI_TEXT_CACHE_SIZE = 32  # rendered HUD strings kept
+HUD_COLORKEY = (255, 0, 255)  # marks the see-through parts of the HUD surface
 
 #general colors
 WATER_COLOR = '#71ddee'
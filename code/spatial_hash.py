@@ -0,0 +1,193 @@
+import pygame
+from settings import *
+
+class SpatialHash:
+    """Uniform grid that maps each cell to the items whose rect overlaps it."""
+    def __init__(self, cell_size = SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.item_cells = {}
+
+        # Sort key plus insertion order, so queries return items in the same order a linear scan would
+        self.order = {}
+        self.counter = 0
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        left = rect.left // size
+        top = rect.top // size
+        right = (rect.right - 1) // size
+        bottom = (rect.bottom - 1) // size
+        return [(cx, cy) for cx in range(left, right + 1) for cy in range(top, bottom + 1)]
+
+    def insert(self, item, rect, key = 0):
+        if item in self.item_cells:
+            self.remove(item)
+        cells = self.cell_range(rect)
+        for cell in cells:
+            self.cells.setdefault(cell, []).append(item)
+        self.item_cells[item] = cells
+        self.order[item] = (key, self.counter)
+        self.counter += 1
+
+    def remove(self, item):
+        for cell in self.item_cells.pop(item, ()):
+            bucket = self.cells[cell]
+            bucket.remove(item)
+            if not bucket:
+                del self.cells[cell]
+        self.order.pop(item, None)
+
+    def query(self, rect):
+        """Return every item sharing a cell with rect, ordered by key then insertion."""
+        found = set()
+        cells = self.cells
+        for cell in self.cell_range(rect):
+            bucket = cells.get(cell)
+            if bucket:
+                found.update(bucket)
+        return sorted(found, key = self.order.__getitem__)
+
+    def clear(self):
+        self.cells.clear()
+        self.item_cells.clear()
+        self.order.clear()
+
+    def __len__(self):
+        return len(self.item_cells)
+
+
+class SpatialGroup(pygame.sprite.Group):
+    """Sprite group that keeps a spatial hash of its static members.
+
+    Sprites are indexed lazily on the first query after they are added, because
+    Tile and Entity only set up their rects after joining their groups.
+    Static sprites are not expected to move; call reindex() after moving one.
+    Moving sprites are kept in a plain list and tested directly on each query.
+    hide() sets a moving sprite aside without leaving the group, so it is
+    neither drawn, updated nor found until show() puts it back.
+    version changes whenever the set of static sprites does, and static_changed()
+    is called with the sprite that was added or removed (None after a reindex).
+
+    Groups given a StaticTiles store also hold the tiles added to it for them;
+    queries return those as TileViews alongside the static sprites. Tiles are
+    not sprites, so len(), iteration and sprites() leave them out.
+    """
+    rect_attribute = 'rect'
+    # Static results ordered by rect.centery, then insertion
+    y_sorted = False
+
+    def __init__(self, *sprites, cell_size = SPATIAL_CELL_SIZE, tiles = None):
+        self.spatial_hash = SpatialHash(cell_size)
+        self.pending = {}
+        self.moving = {}
+        self.hidden = {}
+        self.version = 0
+        self.tiles = tiles
+        if tiles is not None:
+            tiles.register(self)
+        super().__init__(*sprites)
+
+    def tile_count(self):
+        """Stored tiles in the group; len() and iteration only cover its sprites."""
+        return self.tiles.count(self) if self.tiles is not None else 0
+
+    def is_static(self, sprite):
+        return True
+
+    def order_key(self, sprite):
+        return sprite.rect.centery if self.y_sorted else 0
+
+    def static_changed(self, sprite):
+        pass
+
+    def add_internal(self, sprite, layer = None):
+        super().add_internal(sprite, layer)
+        self.pending[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if sprite in self.pending:
+            del self.pending[sprite]
+        elif sprite in self.moving:
+            del self.moving[sprite]
+        elif sprite in self.hidden:
+            del self.hidden[sprite]
+        else:
+            self.spatial_hash.remove(sprite)
+            self.version += 1
+            self.static_changed(sprite)
+
+    def flush(self):
+        for sprite in self.pending:
+            if self.is_static(sprite):
+                self.spatial_hash.insert(sprite, getattr(sprite, self.rect_attribute), self.order_key(sprite))
+                self.version += 1
+                self.static_changed(sprite)
+            else:
+                self.moving[sprite] = None
+        self.pending.clear()
+
+    def hide(self, sprite):
+        if self.pending:
+            self.flush()
+        if sprite in self.moving:
+            del self.moving[sprite]
+            self.hidden[sprite] = None
+
+    def show(self, sprite):
+        if sprite in self.hidden:
+            del self.hidden[sprite]
+            self.moving[sprite] = None
+
+    def reindex(self, sprite):
+        if sprite in self.spatial_hash.item_cells:
+            self.spatial_hash.insert(sprite, getattr(sprite, self.rect_attribute), self.order_key(sprite))
+            self.version += 1
+            # The sprite's old position is not known any more
+            self.static_changed(None)
+
+    def static_query(self, rect):
+        """Return the static sprites and tiles overlapping rect, in order_key then insertion order."""
+        if self.pending:
+            self.flush()
+        attribute = self.rect_attribute
+        found = [sprite for sprite in self.spatial_hash.query(rect) if rect.colliderect(getattr(sprite, attribute))]
+        if self.tiles is not None:
+            tiles = self.tiles.query(rect, self, self.y_sorted)
+            # Both lists are already in order; a stable sort keeps sprites first on ties
+            found = sorted(found + tiles, key = self.order_key) if found else tiles
+        return found
+
+    def query(self, rect):
+        """Return the static sprites and tiles overlapping rect, then the moving sprites."""
+        found = self.static_query(rect)
+        attribute = self.rect_attribute
+        found.extend(sprite for sprite in self.moving if rect.colliderect(getattr(sprite, attribute)))
+        return found
+
+
+class ObstacleGroup(SpatialGroup):
+    """Obstacles indexed by hitbox, for collision checks."""
+    rect_attribute = 'hitbox'
+
+    def nearby(self, rect, margin = TILESIZE):
+        """Return the obstacles that could touch rect, widened by margin on every side.
+
+        The margin covers the pushback a collision check applies to a hitbox after
+        the query, so resolving against the result matches a scan over the group.
+        """
+        return self.query(rect.inflate(margin * 2, margin * 2))
+
+    def nearby_hitboxes(self, rect, margin = TILESIZE):
+        """The hitboxes of nearby(rect, margin), in the same order.
+
+        When the group only holds stored tiles, their hitboxes are read straight
+        from the store instead of through a view per tile.
+        """
+        if self.pending:
+            self.flush()
+        area = rect.inflate(margin * 2, margin * 2)
+        if self.tiles is not None and not self.spatial_hash.item_cells and not self.moving:
+            return self.tiles.hitbox_rects(area, self)
+        return [sprite.hitbox for sprite in self.query(area)]
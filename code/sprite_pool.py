@@ -0,0 +1,33 @@
+class SpritePool:
+    """Reusable sprites, handed out and given back instead of created and killed.
+
+    factory() builds a sprite already in its groups; it stays in them for good.
+    A released sprite is hidden in every group that supports it (see
+    SpatialGroup.hide), and acquire() shows it again after calling its
+    reset() with the acquire arguments. New sprites are only built when every
+    pooled one is in use.
+    """
+    def __init__(self, factory, size = 0):
+        self.factory = factory
+        self.free = []
+        self.built = 0
+        for _ in range(size):
+            self.release(self.build())
+
+    def build(self):
+        self.built += 1
+        return self.factory()
+
+    def acquire(self, *args):
+        sprite = self.free.pop() if self.free else self.build()
+        sprite.reset(*args)
+        for group in sprite.groups():
+            if hasattr(group, 'show'):
+                group.show(sprite)
+        return sprite
+
+    def release(self, sprite):
+        for group in sprite.groups():
+            if hasattr(group, 'hide'):
+                group.hide(sprite)
+        self.free.append(sprite)
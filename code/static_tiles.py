@@ -0,0 +1,239 @@
+"""Static map tiles kept in parallel arrays instead of one Sprite each.
+
+Boundaries, grass and objects never move, so a tile is only a rect, a hitbox,
+a surface index, its kind and the groups it belongs to. StaticTiles keeps
+those in flat arrays with a grid of tile indexes for area queries; the
+SpatialGroups sharing the store return TileView objects from their queries,
+which is all collision, drawing and the world streamer need of a tile.
+"""
+from array import array
+import pygame
+from settings import *
+
+TILE_KINDS = ('invisible', 'grass', 'object')
+KIND_INDEX = {kind: index for index, kind in enumerate(TILE_KINDS)}
+# How much smaller than its rect each kind's hitbox is; boundaries use the full rect.
+# Objects get a slightly smaller hitbox for better visual overlap, and grass a
+# small reduction so the player can appear behind it
+HITBOX_SHRINK = {'object': (-5, -10), 'grass': (0, -5)}
+
+
+class TileView:
+    """One stored tile behind the Sprite attributes the game uses.
+
+    rect and hitbox are fresh Rects on every access, so changing them does not
+    move the tile. A view of a tile that was killed stays dead even after its
+    slot is reused.
+    """
+    __slots__ = ('tiles', 'index', 'order')
+
+    def __init__(self, tiles, index, order):
+        self.tiles = tiles
+        self.index = index
+        self.order = order
+
+    @property
+    def rect(self):
+        return self.tiles.box(self.tiles.rects, self.index)
+
+    @property
+    def hitbox(self):
+        return self.tiles.hitboxes[self.index].copy()
+
+    @property
+    def image(self):
+        return self.tiles.surfaces[self.tiles.surface_ids[self.index]]
+
+    @property
+    def sprite_type(self):
+        return TILE_KINDS[self.tiles.kinds[self.index]]
+
+    def alive(self):
+        return self.tiles.masks[self.index] != 0 and self.tiles.orders[self.index] == self.order
+
+    def kill(self):
+        if self.alive():
+            self.tiles.remove(self.index)
+
+    def debug_draw(self, surface, offset):
+        """Debug method to visualize hitboxes"""
+        hitbox = self.hitbox
+        pygame.draw.rect(surface, 'red', (hitbox.x - offset.x, hitbox.y - offset.y, hitbox.width, hitbox.height), 2)
+
+    def __eq__(self, other):
+        return isinstance(other, TileView) and (self.tiles, self.index, self.order) == (other.tiles, other.index, other.order)
+
+    def __hash__(self):
+        return hash((self.index, self.order))
+
+
+class StaticTiles:
+    """Rects, hitboxes, surfaces and group masks of every static tile, indexed on a grid.
+
+    Rects are stored as left, top, right and bottom columns. Hitboxes are the
+    one exception: every collision check reads them, so they are kept as one
+    Rect per slot and handed out without building new Rects. That costs about
+    30 bytes a tile over int columns (about 107 against 76 B/tile), but
+    building a Rect per result made store queries slower than Tile sprites:
+    458 against 352 ms for bench_static_tiles.py's 64x64 queries, where the
+    Rect list takes 245. Groups join with register(), which SpatialGroup does
+    when it is given the store.
+    Slots of removed tiles are reused; orders keeps the insertion counter, so
+    queries return tiles in the same order a spatial hash of sprites would.
+    """
+    def __init__(self, cell_size = SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self.rects = tuple(array('i') for _ in range(4))
+        self.hitboxes = []
+        self.surface_ids = array('i')
+        self.kinds = bytearray()
+        self.masks = bytearray()
+        self.orders = array('q')
+        self.cells = {}
+        self.free = []
+        self.counter = 0
+
+        self.groups = []
+        self.counts = {}
+        self.surfaces = [pygame.Surface((TILESIZE, TILESIZE))]
+        self.surface_index = {}
+
+    def register(self, group):
+        if len(self.groups) == 8:
+            raise ValueError('a tile store holds at most 8 groups')
+        group.tile_bit = 1 << len(self.groups)
+        self.groups.append(group)
+        self.counts[group.tile_bit] = 0
+
+    @staticmethod
+    def box(columns, index):
+        left, top, right, bottom = columns
+        return pygame.Rect(left[index], top[index], right[index] - left[index], bottom[index] - top[index])
+
+    def cell_range(self, left, top, right, bottom):
+        size = self.cell_size
+        return [(cx, cy) for cx in range(left // size, (right - 1) // size + 1)
+                for cy in range(top // size, (bottom - 1) // size + 1)]
+
+    def add(self, pos, groups, sprite_type, surface = None, size = None):
+        """Store a tile at pos in groups, as Tile(pos, groups, sprite_type, surface) would; returns its view."""
+        if surface is None:
+            surface_id = 0
+        else:
+            surface_id = self.surface_index.get(surface)
+            if surface_id is None:
+                surface_id = self.surface_index[surface] = len(self.surfaces)
+                self.surfaces.append(surface)
+        rect = pygame.Rect(pos, size or self.surfaces[surface_id].get_size())
+        hitbox = rect.inflate(HITBOX_SHRINK[sprite_type]) if sprite_type in HITBOX_SHRINK else rect.copy()
+        kind = KIND_INDEX[sprite_type]
+        bounds = (rect.left, rect.top, rect.right, rect.bottom)
+
+        mask = 0
+        for group in groups:
+            if group.tiles is not self:
+                raise ValueError('group does not share this tile store')
+            mask |= group.tile_bit
+
+        if self.free:
+            index = self.free.pop()
+            for column, value in zip(self.rects, bounds):
+                column[index] = value
+            self.hitboxes[index] = hitbox
+            self.surface_ids[index] = surface_id
+            self.kinds[index] = kind
+            self.masks[index] = mask
+            self.orders[index] = self.counter
+        else:
+            index = len(self.masks)
+            for column, value in zip(self.rects, bounds):
+                column.append(value)
+            self.hitboxes.append(hitbox)
+            self.surface_ids.append(surface_id)
+            self.kinds.append(kind)
+            self.masks.append(mask)
+            self.orders.append(self.counter)
+        self.counter += 1
+
+        cells = self.cells
+        for cell in self.cell_range(*bounds):
+            bucket = cells.get(cell)
+            if bucket is None:
+                bucket = cells[cell] = array('i')
+            bucket.append(index)
+
+        view = TileView(self, index, self.orders[index])
+        for group in groups:
+            self.counts[group.tile_bit] += 1
+            group.version += 1
+            group.static_changed(view)
+        return view
+
+    def remove(self, index):
+        view = TileView(self, index, self.orders[index])
+        mask = self.masks[index]
+        for group in self.groups:
+            if mask & group.tile_bit:
+                self.counts[group.tile_bit] -= 1
+                group.version += 1
+                group.static_changed(view)
+
+        for cell in self.cell_range(*(column[index] for column in self.rects)):
+            bucket = self.cells[cell]
+            bucket.remove(index)
+            if not bucket:
+                del self.cells[cell]
+        self.masks[index] = 0
+        self.free.append(index)
+
+    def find(self, rect, group, y_sorted = False):
+        """Indexes of the group's tiles whose rect (or hitbox, for groups indexed by it) overlaps rect.
+
+        Ordered by insertion, or by rect.centery then insertion when y_sorted.
+        """
+        left, top, right, bottom = rect.left, rect.top, rect.right, rect.bottom
+        if left == right or top == bottom:
+            return []
+        cells = self.cells
+        buckets = [bucket for bucket in map(cells.get, self.cell_range(left, top, right, bottom)) if bucket]
+        candidates = buckets[0] if len(buckets) == 1 else set().union(*buckets)
+
+        bit = group.tile_bit
+        masks = self.masks
+        if group.rect_attribute == 'hitbox':
+            hitboxes = self.hitboxes
+            colliderect = rect.colliderect
+            found = [index for index in candidates if masks[index] & bit and colliderect(hitboxes[index])]
+        else:
+            lefts, tops, rights, bottoms = self.rects
+            found = [index for index in candidates
+                     if masks[index] & bit and lefts[index] < right and tops[index] < bottom
+                     and rights[index] > left and bottoms[index] > top]
+
+        orders = self.orders
+        if y_sorted:
+            _, tops, _, bottoms = self.rects
+            # Same rounding as Rect.centery
+            found.sort(key = lambda index: ((tops[index] + bottoms[index]) // 2, orders[index]))
+        else:
+            found.sort(key = orders.__getitem__)
+        return found
+
+    def query(self, rect, group, y_sorted = False):
+        """Views of the tiles find() returns."""
+        orders = self.orders
+        return [TileView(self, index, orders[index]) for index in self.find(rect, group, y_sorted)]
+
+    def hitbox_rects(self, rect, group):
+        """The stored hitboxes of the tiles find() returns, without a view per tile; do not change them."""
+        hitboxes = self.hitboxes
+        return [hitboxes[index] for index in self.find(rect, group)]
+
+    def views(self, group):
+        """Every tile in group, in insertion order."""
+        bit = group.tile_bit
+        found = sorted((index for index, mask in enumerate(self.masks) if mask & bit), key = self.orders.__getitem__)
+        return [TileView(self, index, self.orders[index]) for index in found]
+
+    def count(self, group):
+        return self.counts[group.tile_bit]
@@ -1,35 +1,47 @@
 from csv import reader
+import re
+import numpy as np
 import pygame
-def import_csv_layout(path):
-    """Import CSV and return all values as strings, unchanged."""
-    terrain_map = []
-    with open(path) as level_map:
-        layout = reader(level_map, delimiter=',')
-        for row in layout:
-            terrain_map.append([cell.strip() for cell in row])
-    return terrain_map
+from asset_cache import assets
+# A CSV row whose cells are all written the way str(int) would write them
+PLAIN_INT_ROW = re.compile(r'(?:0|-?[1-9][0-9]*)(?:,(?:0|-?[1-9][0-9]*))*')
+
+def import_csv_array(path, raw = False):
+    """Import CSV as a 2D int32 array plus the cells that are not plain integers.
 
-def import_csv_layout_raw(path):
-    """Import CSV without any normalization - keeps original values for object pattern matching"""
-    terrain_map = []
+    Those cells are stored as -1 in the array and returned in a {(row, col): text}
+    dict, stripped unless raw is set, so callers can keep the string-based rules
+    for them. Short rows are padded with -1.
+    """
+    rows = []
+    irregular = {}
     with open(path) as level_map:
         layout = reader(level_map, delimiter = ',')
-        for row in layout:
-            terrain_map.append(list(row))  # Keep original values
-        return terrain_map
+        for row_index, row in enumerate(layout):
+            if not raw:
+                row = [cell.strip() for cell in row]
+            if PLAIN_INT_ROW.fullmatch(','.join(row)):
+                rows.append(list(map(int, row)))
+                continue
+
+            values = []
+            for col_index, cell in enumerate(row):
+                try:
+                    value = int(cell)
+                except ValueError:
+                    value = None
+                if value is None or str(value) != cell:
+                    irregular[(row_index, col_index)] = cell
+                    value = -1
+                values.append(value)
+            rows.append(values)
+
+    width = max((len(row) for row in rows), default = 0)
+    array = np.full((len(rows), width), -1, dtype = np.int32)
+    for row_index, row in enumerate(rows):
+        array[row_index, :len(row)] = row
+    return array, irregular
 
 def import_folder(path):
-    """Import all images from a folder"""
-    surface_list = []
-    
-    # This function should load all images from the specified folder
-    # You'll need to implement this based on your file structure
-    # Here's a basic version:
-    import os
-    for filename in os.listdir(path):
-        if filename.endswith(('.png', '.jpg', '.jpeg')):
-            full_path = os.path.join(path, filename)
-            image = pygame.image.load(full_path).convert_alpha()
-            surface_list.append(image)
-    
-    return surface_list
\ No newline at end of file
+    """Import all images from a folder, shared through the asset cache"""
+    return assets.folder(path)
\ No newline at end of file
@@ -1,5 +1,6 @@
 import pygame
 from settings import *
+from static_tiles import HITBOX_SHRINK
 
 class Tile(pygame.sprite.Sprite):
     def __init__(self, pos, groups, sprite_type, surface = pygame.Surface((TILESIZE, TILESIZE))):
@@ -9,13 +10,9 @@ class Tile(pygame.sprite.Sprite):
         self.image = surface
         self.rect = self.image.get_rect(topleft = pos)
 
-        # Simple hitbox adjustment based on sprite type
-        if sprite_type == 'object':
-            # Objects get a slightly smaller hitbox for better visual overlap
-            self.hitbox = self.rect.inflate(-5, -10)
-        elif sprite_type == 'grass':
-            # Grass gets a small reduction so player can appear behind it
-            self.hitbox = self.rect.inflate(0, -5)
+        # Same hitboxes as the tiles in StaticTiles
+        if sprite_type in HITBOX_SHRINK:
+            self.hitbox = self.rect.inflate(HITBOX_SHRINK[sprite_type])
         else:
             # Boundaries and default use full rect
             self.hitbox = self.rect.copy()
@@ -0,0 +1,266 @@
+"""Load Tiled TMX maps, with their TSX tilesets, for Level.create_map.
+
+A TMX map is compiled into the same arrays as the CSV layers (see
+map_compiler), and cached next to it until the TMX or one of its tilesets
+changes. Layer data can be csv or base64, uncompressed or zlib, gzip or zstd
+compressed; zstd needs the zstandard package. Infinite (chunked) maps are
+not supported.
+
+Tiled stores each cell as a GID: the tile's index in its tileset plus the
+tileset's firstgid, with flip flags in the top bits. The CSV export writes
+GID - firstgid instead (csv_to_tmx writes local id + firstgid back), so
+layers are turned into those local ids before the map_compiler rules run and
+compile to the same arrays as the CSVs. The object GIDs are kept as well, in
+object_gid_cells, for TileSurfaces to cut and flip the surfaces from.
+
+Run from the project root to compile a map ahead of time:  python code/tmx_loader.py MAP.tmx
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import zlib
+import xml.etree.ElementTree as ElementTree
+import numpy as np
+import pygame
+from asset_cache import assets
+from map_compiler import classify_layers, compact, cells
+
+try:
+    import zstandard
+except ImportError:
+    # Only needed for zstd compressed layers
+    zstandard = None
+
+# Bump when the compiled layout changes so stale files are rebuilt
+FORMAT_VERSION = 2
+
+# TMX layer names accepted for each map_compiler layer: the shipped Tiled map's
+# name first, then the one csv_to_tmx writes where it differs
+TMX_LAYERS = {
+    'boundary': ('boundary_blocks', 'boundary'),
+    'grass': ('details',),
+    'object': ('objects',),
+    'enemy': ('entities',),
+}
+
+FLIPPED_HORIZONTALLY = 0x80000000
+FLIPPED_VERTICALLY = 0x40000000
+FLIPPED_DIAGONALLY = 0x20000000
+# The fourth flag bit marks rotated hexagonal tiles, which are not supported
+GID_MASK = 0x0FFFFFFF
+
+TILESET_SOURCE = re.compile(rb'<tileset[^>]*\ssource="([^"]+)"')
+
+
+def source_hash(tmx_path):
+    """Hash of the TMX file and the external tilesets it uses."""
+    digest = hashlib.sha1(str(FORMAT_VERSION).encode())
+    with open(tmx_path, 'rb') as tmx_file:
+        tmx_data = tmx_file.read()
+    digest.update(tmx_data)
+    for source in TILESET_SOURCE.findall(tmx_data):
+        tsx_path = os.path.join(os.path.dirname(tmx_path), source.decode())
+        if os.path.exists(tsx_path):
+            with open(tsx_path, 'rb') as tsx_file:
+                digest.update(tsx_file.read())
+    return digest.hexdigest()
+
+
+def parse_tileset(element, firstgid, directory):
+    """Tileset attributes, with image paths resolved against the file they were declared in."""
+    tileset = {
+        'firstgid': firstgid,
+        'name': element.get('name', ''),
+        'tilewidth': int(element.get('tilewidth')),
+        'tileheight': int(element.get('tileheight')),
+        'tilecount': int(element.get('tilecount', 0)),
+        'columns': int(element.get('columns', 0)),
+        'spacing': int(element.get('spacing', 0)),
+        'margin': int(element.get('margin', 0)),
+        'image': None,
+        'tiles': {},
+    }
+    image = element.find('image')
+    if image is not None:
+        tileset['image'] = os.path.normpath(os.path.join(directory, image.get('source')))
+    # Image collection tilesets give every tile its own image
+    for tile in element.findall('tile'):
+        tile_image = tile.find('image')
+        if tile_image is not None:
+            tileset['tiles'][tile.get('id')] = os.path.normpath(os.path.join(directory, tile_image.get('source')))
+    return tileset
+
+
+def decode_data(data, width, height):
+    """A layer's <data> element as a (height, width) array of raw GIDs."""
+    encoding = data.get('encoding')
+    compression = data.get('compression')
+    if data.find('chunk') is not None:
+        raise ValueError('infinite maps are not supported')
+    if encoding == 'csv':
+        text = data.text.replace('\n', '').strip().strip(',')
+        gids = np.array(text.split(','), dtype = np.int64) & 0xFFFFFFFF
+    elif encoding == 'base64':
+        raw = base64.b64decode(data.text.strip())
+        if compression == 'zlib':
+            raw = zlib.decompress(raw)
+        elif compression == 'gzip':
+            raw = gzip.decompress(raw)
+        elif compression == 'zstd':
+            if zstandard is None:
+                raise RuntimeError('zstd compressed layers need the zstandard package (pip install zstandard)')
+            raw = zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+        elif compression:
+            raise ValueError(f'unknown layer compression {compression!r}')
+        gids = np.frombuffer(raw, dtype = '<u4').astype(np.int64)
+    elif encoding is None:
+        gids = np.array([int(tile.get('gid', 0)) for tile in data.findall('tile')], dtype = np.int64)
+    else:
+        raise ValueError(f'unknown layer encoding {encoding!r}')
+    return gids.reshape(height, width)
+
+
+def parse_tmx(path):
+    """Map size, tilesets and raw GID layers of a TMX file."""
+    root = ElementTree.parse(path).getroot()
+    if root.get('infinite') == '1':
+        raise ValueError('infinite maps are not supported')
+    directory = os.path.dirname(path)
+
+    tilesets = []
+    for element in root.findall('tileset'):
+        firstgid = int(element.get('firstgid'))
+        source = element.get('source')
+        if source:
+            tsx_path = os.path.join(directory, source)
+            element = ElementTree.parse(tsx_path).getroot()
+            tilesets.append(parse_tileset(element, firstgid, os.path.dirname(tsx_path)))
+        else:
+            tilesets.append(parse_tileset(element, firstgid, directory))
+    tilesets.sort(key = lambda tileset: tileset['firstgid'])
+
+    layers = {}
+    for layer in root.iter('layer'):
+        layers[layer.get('name')] = decode_data(layer.find('data'), int(layer.get('width')), int(layer.get('height')))
+    return {
+        'size': (int(root.get('height')), int(root.get('width'))),
+        'tilesets': tilesets,
+        'layers': layers,
+    }
+
+
+def local_ids(gids, tilesets):
+    """Layer values as the CSV export writes them: GID - firstgid, flags kept, -1 for empty."""
+    firstgids = np.array([tileset['firstgid'] for tileset in tilesets], dtype = np.int64)
+    plain = gids & GID_MASK
+    owner = np.searchsorted(firstgids, plain, side = 'right') - 1
+    signed = np.where(gids >= 0x80000000, gids - 0x100000000, gids)
+    found = (plain != 0) & (owner >= 0)
+    return np.where(found, signed - firstgids[np.maximum(owner, 0)], -1)
+
+
+def find_layer(parsed, name, path):
+    for tmx_name in TMX_LAYERS[name]:
+        if tmx_name in parsed['layers']:
+            return parsed['layers'][tmx_name]
+    raise ValueError(f'{path} has no {" or ".join(TMX_LAYERS[name])} layer')
+
+
+def compile_tmx(path):
+    parsed = parse_tmx(path)
+    tilesets = parsed['tilesets']
+    gid_layers = {name: find_layer(parsed, name, path) for name in TMX_LAYERS}
+    layers = {name: local_ids(gids, tilesets) for name, gids in gid_layers.items()}
+    compiled = classify_layers(layers['boundary'], layers['grass'], layers['object'], layers['enemy'])
+
+    # Objects are drawn from their tileset, so they also keep the full GID, flip flags included
+    objects = gid_layers['object']
+    object_mask = objects != 0
+    compiled['object_gid_cells'] = np.concatenate([cells(object_mask), objects[object_mask].reshape(-1, 1)], axis = 1)
+    compiled['tilesets'] = np.array(json.dumps(tilesets))
+    return compiled
+
+
+def load_tmx(path, cache_path = None):
+    """Load a compiled TMX map, rebuilding it when it is missing or the TMX or its tilesets changed.
+
+    The cache defaults to <map>.tmx.compiled.npz, apart from the CSV layers' <map>.compiled.npz.
+    """
+    cache_path = cache_path or path + '.compiled.npz'
+    digest = source_hash(path)
+    if os.path.exists(cache_path):
+        try:
+            with np.load(cache_path) as cached:
+                if str(cached['source_hash']) == digest:
+                    return {name: cached[name] for name in cached.files}
+        except (OSError, ValueError, KeyError):
+            pass  # Unreadable or outdated file, rebuild it below
+    compiled = compile_tmx(path)
+    compiled['source_hash'] = np.array(digest)
+    with open(cache_path, 'wb') as cache_file:
+        np.savez(cache_file, **compiled)
+    return compiled
+
+
+class TileSurfaces:
+    """Tile surfaces by GID, cut from their tileset image on first use and kept.
+
+    Tiles of a tileset whose image is missing come from image_overrides,
+    {tileset name: {local id: image path}}, when it has them. Flip flags in
+    the GID are applied to a copy of the tile.
+    """
+    def __init__(self, tilesets, image_overrides = None):
+        if isinstance(tilesets, np.ndarray):
+            tilesets = json.loads(str(tilesets))
+        self.tilesets = tilesets
+        self.firstgids = [tileset['firstgid'] for tileset in tilesets]
+        self.image_overrides = image_overrides or {}
+        self.surfaces = {}
+
+    def get(self, gid, default = None):
+        surf = self.surfaces.get(gid)
+        if surf is None:
+            surf = self.surfaces[gid] = self.cut(gid)
+        return surf if surf is not False else default
+
+    def cut(self, gid):
+        plain = gid & GID_MASK
+        owner = np.searchsorted(self.firstgids, plain, side = 'right') - 1
+        if plain == 0 or owner < 0:
+            return False
+        tileset = self.tilesets[owner]
+        local_id = plain - tileset['firstgid']
+
+        if str(local_id) in tileset['tiles']:
+            surf = assets.image(tileset['tiles'][str(local_id)])
+        elif tileset['image'] and os.path.exists(tileset['image']):
+            sheet = assets.image(tileset['image'])
+            columns = tileset['columns'] or 1
+            margin, spacing = tileset['margin'], tileset['spacing']
+            width, height = tileset['tilewidth'], tileset['tileheight']
+            x = margin + (local_id % columns) * (width + spacing)
+            y = margin + (local_id // columns) * (height + spacing)
+            if local_id >= tileset['tilecount'] or not sheet.get_rect().contains((x, y, width, height)):
+                return False
+            surf = sheet.subsurface((x, y, width, height))
+        elif local_id in self.image_overrides.get(tileset['name'], {}):
+            surf = assets.image(self.image_overrides[tileset['name']][local_id])
+        else:
+            return False
+
+        if gid & FLIPPED_DIAGONALLY:
+            surf = pygame.transform.flip(pygame.transform.rotate(surf, 90), False, True)
+        if gid & (FLIPPED_HORIZONTALLY | FLIPPED_VERTICALLY):
+            surf = pygame.transform.flip(surf, bool(gid & FLIPPED_HORIZONTALLY), bool(gid & FLIPPED_VERTICALLY))
+        return surf
+
+
+if __name__ == '__main__':
+    tmx_path = sys.argv[1]
+    compiled = load_tmx(tmx_path)
+    print(f'Compiled {len(compiled["boundary_rects"])} boundaries, {len(compiled["grass_cells"])} grass, '
+          f'{len(compiled["object_cells"])} objects, {len(compiled["spawns"])} spawns from {tmx_path}')
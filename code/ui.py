@@ -1,5 +1,7 @@
 import pygame
+from collections import OrderedDict
 from settings import *
+from asset_cache import assets
 
 class UI:
     def __init__(self):
@@ -16,12 +18,43 @@ class UI:
         self.weapon_graphics = []
         for weapon in weapon_data.values():
             path = weapon['graphic']
-            weapon = pygame.image.load(path).convert_alpha()
+            weapon = assets.image(path)
             self.weapon_graphics.append(weapon)
+
+        #magic icons by spell name
+        self.magic_graphics = {name: assets.image(magic['graphic']) for name, magic in magic_data.items()}
+
+        # HUD is composed here and only redrawn when what it shows changes.
+        # hud_rects are the areas drawn on; only those are copied to the screen.
+        # Every HUD element is opaque, so a colorkey is enough to keep the
+        # rest of the screen showing through, and blits much faster than alpha
+        self.hud_surface = pygame.Surface(self.display_surface.get_size()).convert()
+        self.hud_surface.set_colorkey(HUD_COLORKEY)
+        self.hud_state = None
+        self.hud_rects = []
+        self.hud_blits = []
+
+        # Rendered text by (text, antialias), least recently used dropped first
+        self.text_cache = OrderedDict()
+        self.cooldown_overlay = pygame.Surface((ITEM_BOX_SIZE, ITEM_BOX_SIZE))
+        self.cooldown_overlay.fill((0, 0, 0))
+        self.cooldown_overlay.set_alpha(200)
+
+    def render_text(self, text, antialias):
+        key = (text, antialias)
+        text_surf = self.text_cache.get(key)
+        if text_surf is None:
+            text_surf = self.font.render(text, antialias, TEXT_COLOR)
+            self.text_cache[key] = text_surf
+            if len(self.text_cache) > UI_TEXT_CACHE_SIZE:
+                self.text_cache.popitem(last = False)
+        else:
+            self.text_cache.move_to_end(key)
+        return text_surf
     
     def show_bar(self, current, max_amount, bg_rect, color):
         #draw the bg
-        pygame.draw.rect(self.display_surface,UI_BG_COLOR,bg_rect)
+        pygame.draw.rect(self.hud_surface,UI_BG_COLOR,bg_rect)
 
         #converting stats to pixels
         ratio = current / max_amount
@@ -30,26 +63,29 @@ class UI:
         current_rect.width = current_width
 
         #draw the bar
-        pygame.draw.rect(self.display_surface,color,current_rect)
-        pygame.draw.rect(self.display_surface,UI_BORDER_COLOR,bg_rect,3)
+        pygame.draw.rect(self.hud_surface,color,current_rect)
+        pygame.draw.rect(self.hud_surface,UI_BORDER_COLOR,bg_rect,3)
+        self.hud_rects.append(bg_rect)
 
     def show_exp(self,exp):
-        text_surf = self.font.render(str(int(exp)),False,TEXT_COLOR)
-        x = self.display_surface.get_width() - 20
-        y = self.display_surface.get_height() - 20
-        text_rect = text_surf.get_rect(bottomright=(self.display_surface.get_width()-10,self.display_surface.get_height()-10))
+        text_surf = self.render_text(str(int(exp)),False)
+        x = self.hud_surface.get_width() - 20
+        y = self.hud_surface.get_height() - 20
+        text_rect = text_surf.get_rect(bottomright=(self.hud_surface.get_width()-10,self.hud_surface.get_height()-10))
 
-        pygame.draw.rect(self.display_surface,UI_BG_COLOR,text_rect.inflate(7,7))
-        pygame.draw.rect(self.display_surface,UI_BORDER_COLOR,text_rect.inflate(7,7),3)
-        self.display_surface.blit(text_surf,text_rect)
+        pygame.draw.rect(self.hud_surface,UI_BG_COLOR,text_rect.inflate(7,7))
+        pygame.draw.rect(self.hud_surface,UI_BORDER_COLOR,text_rect.inflate(7,7),3)
+        self.hud_surface.blit(text_surf,text_rect)
+        self.hud_rects.append(text_rect.inflate(7,7))
 
     def selection_box(self,left,top,has_switched):
         bg_rect = pygame.Rect(left,top,ITEM_BOX_SIZE,ITEM_BOX_SIZE)
-        pygame.draw.rect(self.display_surface,UI_BG_COLOR,bg_rect)
+        pygame.draw.rect(self.hud_surface,UI_BG_COLOR,bg_rect)
         if has_switched:
-            pygame.draw.rect(self.display_surface,UI_BORDER_COLOR_ACTIVE,bg_rect,3)
+            pygame.draw.rect(self.hud_surface,UI_BORDER_COLOR_ACTIVE,bg_rect,3)
         else:
-            pygame.draw.rect(self.display_surface,UI_BORDER_COLOR,bg_rect,3)
+            pygame.draw.rect(self.hud_surface,UI_BORDER_COLOR,bg_rect,3)
+        self.hud_rects.append(bg_rect)
         return bg_rect
 
 
@@ -60,9 +96,10 @@ class UI:
         weapon_rect = weapon_surf.get_rect(center=bg_rect.center)
         # load weapon graphic from settings using index
 
-        self.display_surface.blit(weapon_surf, weapon_rect)
+        self.hud_surface.blit(weapon_surf, weapon_rect)
+        self.hud_rects.append(weapon_rect)
     
-    def magic_overlay(self, player):
+    def magic_overlay(self, player, remaining):
         """Draw a single magic box that shows the last cast spell"""
         left = 120   # x position for the magic box
         top = 630    # y position for the magic box
@@ -73,32 +110,40 @@ class UI:
         # which spell to show? → the last one the player selected
         magic_name = player.magic
 
-        # load magic icon
-        magic_path = magic_data[magic_name]['graphic']
-        magic_surf = pygame.image.load(magic_path).convert_alpha()
+        # preloaded magic icon
+        magic_surf = self.magic_graphics[magic_name]
         magic_rect = magic_surf.get_rect(center=bg_rect.center)
-        self.display_surface.blit(magic_surf, magic_rect)
+        self.hud_surface.blit(magic_surf, magic_rect)
+        self.hud_rects.append(magic_rect)
 
         # cooldown overlay
-        remaining = player.get_remaining_cooldown(magic_name)
         if remaining > 0:
-            overlay = pygame.Surface((ITEM_BOX_SIZE, ITEM_BOX_SIZE))
-            overlay.fill((0, 0, 0))
-            overlay.set_alpha(200)
-            self.display_surface.blit(overlay, bg_rect.topleft)
+            self.hud_surface.blit(self.cooldown_overlay, bg_rect.topleft)
 
             seconds = round(remaining / 1000, 1)
-            text_surf = self.font.render(str(seconds), True, TEXT_COLOR)
+            text_surf = self.render_text(str(seconds), True)
             text_rect = text_surf.get_rect(center=bg_rect.center)
-            self.display_surface.blit(text_surf, text_rect)
+            self.hud_surface.blit(text_surf, text_rect)
 
 
 
     
     def display(self, player):
-        self.show_bar(player.health,player.stats['health'],self.health_bar_rect,HEALTH_COLOR)
-        self.show_bar(player.energy,player.stats['energy'],self.energy_bar_rect,ENERGY_COLOR)
-        self.show_exp(player.exp)
-
-        self.weapon_overlay(player.weapon_index, not player.can_switch_weapon)
-        self.magic_overlay(player)   # show only one magic box now
+        # The cooldown is only shown to a tenth of a second, so that is all that can change the HUD
+        remaining = player.get_remaining_cooldown(player.magic)
+        state = (player.health, player.stats['health'], player.energy, player.stats['energy'], int(player.exp),
+                 player.weapon_index, player.can_switch_weapon, player.magic, player.can_switch_magic,
+                 remaining > 0, round(remaining / 1000, 1))
+        if state != self.hud_state:
+            self.hud_state = state
+            self.hud_surface.fill(HUD_COLORKEY)
+            self.hud_rects = []
+            self.show_bar(player.health,player.stats['health'],self.health_bar_rect,HEALTH_COLOR)
+            self.show_bar(player.energy,player.stats['energy'],self.energy_bar_rect,ENERGY_COLOR)
+            self.show_exp(player.exp)
+
+            self.weapon_overlay(player.weapon_index, not player.can_switch_weapon)
+            self.magic_overlay(player, remaining)   # show only one magic box now
+            self.hud_blits = [(self.hud_surface, rect, rect) for rect in self.hud_rects]
+
+        self.display_surface.blits(self.hud_blits, False)
@@ -1,13 +1,18 @@
 import pygame
 
 class Weapon(pygame.sprite.Sprite):
-    def __init__(self, player, groups):
+    def __init__(self, groups, weapon_surfaces):
         super().__init__(groups)
-        direction = player.status.split('_')[0]
 
-        #graphics
-        full_path = f'./graphics/weapons/{player.weapon}/{direction}.png'
-        self.image = pygame.image.load(full_path).convert_alpha()
+        #graphics, preloaded by the level and indexed by (weapon, direction)
+        self.weapon_surfaces = weapon_surfaces
+        self.image = next(iter(weapon_surfaces.values()))
+        self.rect = self.image.get_rect()
+
+    def reset(self, player):
+        """Show the player's current weapon next to them; called when the weapon pool hands this out."""
+        direction = player.status.split('_')[0]
+        self.image = self.weapon_surfaces[(player.weapon, direction)]
         
         #placement
         if direction == 'right':
@@ -19,4 +24,4 @@ class Weapon(pygame.sprite.Sprite):
         elif direction == 'down':
             self.rect = self.image.get_rect(midtop = player.rect.midbottom + pygame.math.Vector2(-10,0))
         else:
-            self.rect = self.image.get_rect(center = player.rect.center)
\ No newline at end of file
+            self.rect = self.image.get_rect(center = player.rect.center)
@@ -0,0 +1,222 @@
+"""Load the map in chunks around the player instead of all at once.
+
+The floor image is cut into CHUNK_SIZE tiles once, on the same world grid the
+camera bakes its chunks on. To cut it ahead of time, run from the project root:
+
+    python code/world_streamer.py
+"""
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pygame
+from settings import *
+from map_compiler import load_map, SPAWN_TYPES
+
+
+def chunk_rect(chunk):
+    return pygame.Rect(chunk[0] * CHUNK_SIZE, chunk[1] * CHUNK_SIZE, CHUNK_SIZE, CHUNK_SIZE)
+
+
+def chunk_range(rect):
+    """(left, top, right, bottom) chunk coordinates covering a world rect, inclusive."""
+    return (rect.left // CHUNK_SIZE, rect.top // CHUNK_SIZE,
+            (rect.right - 1) // CHUNK_SIZE, (rect.bottom - 1) // CHUNK_SIZE)
+
+
+def blit_tiled(surface, image, area, origin):
+    """Cover the world rect area with copies of image, on surface whose top left is at world position origin.
+
+    The copies start at area's top left; only those overlapping surface's clip are drawn.
+    """
+    width, height = image.get_size()
+    visible = area.clip(surface.get_clip().move(origin[0], origin[1]))
+    if not visible:
+        return
+    for y in range(area.y + (visible.top - area.y) // height * height, visible.bottom, height):
+        for x in range(area.x + (visible.left - area.x) // width * width, visible.right, width):
+            # The last copies are cut short where area does not hold a whole one
+            copy = pygame.Rect(x, y, width, height).clip(area)
+            surface.blit(image, (copy.x - origin[0], copy.y - origin[1]), copy.move(-x, -y))
+
+
+def floor_chunk_path(folder, chunk):
+    return os.path.join(folder, f'{chunk[0]}_{chunk[1]}.png')
+
+
+def cut_floor(topleft, size = None, floor_path = FLOOR_IMAGE, folder = FLOOR_CHUNK_FOLDER):
+    """Split the floor image, placed at topleft in the world, into one PNG per chunk.
+
+    With a size, the image is repeated to cover that much of the world, as the
+    camera does for maps larger than it. Skipped when the folder already holds
+    the tiles for this image, position and size.
+    """
+    source = os.stat(floor_path)
+    stamp = f'{source.st_size} {source.st_mtime_ns} {tuple(topleft)} {size and tuple(size)} {CHUNK_SIZE}'
+    stamp_path = os.path.join(folder, 'source.txt')
+    if os.path.exists(stamp_path):
+        with open(stamp_path) as stamp_file:
+            if stamp_file.read() == stamp:
+                return
+
+    os.makedirs(folder, exist_ok = True)
+    for old_tile in glob.glob(os.path.join(folder, '*.png')):
+        os.remove(old_tile)
+    floor = pygame.image.load(floor_path)
+    floor_rect = pygame.Rect(topleft, size or floor.get_size())
+    left, top, right, bottom = chunk_range(floor_rect)
+    for chunk_y in range(top, bottom + 1):
+        for chunk_x in range(left, right + 1):
+            rect = chunk_rect((chunk_x, chunk_y))
+            tile = pygame.Surface(rect.size)
+            tile.fill('black')
+            blit_tiled(tile, floor, floor_rect, rect.topleft)
+            pygame.image.save(tile, floor_chunk_path(folder, (chunk_x, chunk_y)))
+    with open(stamp_path, 'w') as stamp_file:
+        stamp_file.write(stamp)
+
+
+class WorldStreamer:
+    """Keeps the chunks around the player loaded and drops the ones it left behind.
+
+    A worker thread reads each chunk's floor tile and picks its boundaries,
+    tiles and spawns out of the compiled map; the main thread only turns that
+    into sprites, one chunk per update, so crossing a chunk border never waits
+    on the disk. Chunks within radius of the player's chunk are loaded, and
+    unloaded once they are more than radius + 1 chunks away.
+
+    Merged boundary rectangles are clipped to the chunk they are loaded with.
+    Enemies are unloaded with the chunk they stand in, and respawn at their
+    spawn point when that chunk loads again.
+    """
+    def __init__(self, level, compiled, radius = STREAM_RADIUS, floor_folder = FLOOR_CHUNK_FOLDER):
+        self.level = level
+        self.radius = radius
+        self.floor_folder = floor_folder
+        rows, cols = level.map_size
+        cut_floor(level.map_offset, (cols * TILESIZE, rows * TILESIZE), folder = floor_folder)
+
+        # Everything in world pixels, so a chunk is cut out with plain comparisons
+        offset = np.array(level.map_offset, dtype = np.int64)
+        self.boundary_rects = compiled['boundary_rects'].astype(np.int64) * TILESIZE
+        self.boundary_rects[:, :2] += offset
+        self.grass_cells = compiled['grass_cells'].astype(np.int64) * TILESIZE + offset
+        self.object_cells = compiled['object_cells'].astype(np.int64)
+        self.object_cells[:, :2] = self.object_cells[:, :2] * TILESIZE + offset
+        spawns = compiled['spawns'].astype(np.int64)
+        spawns = spawns[spawns[:, 2] != SPAWN_TYPES.index('player')]
+        spawns[:, :2] = spawns[:, :2] * TILESIZE + offset
+        self.spawns = spawns
+
+        self.chunk_bounds = chunk_range(pygame.Rect(level.map_offset, (cols * TILESIZE, rows * TILESIZE)))
+        self.center_chunk = None
+        self.loaded = {}
+        self.pending = {}
+        self.spawned = {}
+        self.executor = ThreadPoolExecutor(max_workers = 1, thread_name_prefix = 'world-streamer')
+
+    def chunks_around(self, chunk, radius):
+        left, top, right, bottom = self.chunk_bounds
+        return {(chunk_x, chunk_y)
+                for chunk_y in range(max(top, chunk[1] - radius), min(bottom, chunk[1] + radius) + 1)
+                for chunk_x in range(max(left, chunk[0] - radius), min(right, chunk[0] + radius) + 1)}
+
+    def read_chunk(self, chunk):
+        """Runs on the worker thread: the chunk's floor tile and what to build in it."""
+        rect = chunk_rect(chunk)
+        path = floor_chunk_path(self.floor_folder, chunk)
+        floor = pygame.image.load(path) if os.path.exists(path) else None
+
+        rects = self.boundary_rects
+        left = np.maximum(rects[:, 0], rect.left)
+        top = np.maximum(rects[:, 1], rect.top)
+        right = np.minimum(rects[:, 0] + rects[:, 2], rect.right)
+        bottom = np.minimum(rects[:, 1] + rects[:, 3], rect.bottom)
+        clipped = (right > left) & (bottom > top)
+        boundaries = np.stack([left, top, right - left, bottom - top], axis = 1)[clipped]
+
+        def inside(positions):
+            return ((positions[:, 0] >= rect.left) & (positions[:, 0] < rect.right)
+                    & (positions[:, 1] >= rect.top) & (positions[:, 1] < rect.bottom))
+
+        return {
+            'floor': floor,
+            'boundaries': boundaries.tolist(),
+            'grass': self.grass_cells[inside(self.grass_cells)].tolist(),
+            'objects': self.object_cells[inside(self.object_cells)].tolist(),
+            'spawns': np.nonzero(inside(self.spawns))[0].tolist(),
+        }
+
+    def update(self, pos):
+        """Queue and unload chunks when pos enters another chunk, then build one finished chunk."""
+        chunk = (int(pos[0]) // CHUNK_SIZE, int(pos[1]) // CHUNK_SIZE)
+        if chunk != self.center_chunk:
+            self.center_chunk = chunk
+            wanted = self.chunks_around(chunk, self.radius)
+            nearest_first = sorted(wanted - self.loaded.keys() - self.pending.keys(),
+                                   key = lambda other: max(abs(other[0] - chunk[0]), abs(other[1] - chunk[1])))
+            for other in nearest_first:
+                self.pending[other] = self.executor.submit(self.read_chunk, other)
+
+            kept = self.chunks_around(chunk, self.radius + 1)
+            for other in [other for other in self.loaded if other not in kept]:
+                self.unload(other)
+            for other in [other for other in self.pending if other not in kept]:
+                self.pending.pop(other).cancel()
+
+        for other, future in self.pending.items():
+            if future.done():
+                self.install(other, future.result())
+                break
+
+    def load_around(self, pos, radius = 1):
+        """Build the chunks within radius of pos right away, waiting on the worker if needed."""
+        self.update(pos)
+        for other in sorted(self.chunks_around(self.center_chunk, radius)):
+            if other in self.pending:
+                self.install(other, self.pending[other].result())
+
+    def install(self, chunk, contents):
+        del self.pending[chunk]
+        level = self.level
+        tiles = [level.create_boundary(rect) for rect in contents['boundaries']]
+        tiles.extend(level.create_grass(pos) for pos in contents['grass'])
+        for x, y, object_id in contents['objects']:
+            tile = level.create_object((x, y), object_id)
+            if tile:
+                tiles.append(tile)
+        self.loaded[chunk] = tiles
+
+        for index in contents['spawns']:
+            enemy = self.spawned.get(index)
+            if enemy is None or not enemy.alive():
+                x, y, spawn_type = self.spawns[index]
+                self.spawned[index] = level.create_enemy(SPAWN_TYPES[spawn_type], (int(x), int(y)))
+
+        if contents['floor'] is not None:
+            level.visible_sprites.set_floor_tile(chunk, contents['floor'].convert())
+        level.obstacles_changed(chunk_rect(chunk))
+
+    def unload(self, chunk):
+        rect = chunk_rect(chunk)
+        for tile in self.loaded.pop(chunk):
+            tile.kill()
+        for index, enemy in list(self.spawned.items()):
+            if not enemy.alive():
+                del self.spawned[index]
+            elif rect.collidepoint(enemy.hitbox.center):
+                enemy.kill()
+                del self.spawned[index]
+        self.level.visible_sprites.set_floor_tile(chunk, None)
+        self.level.obstacles_changed(rect)
+
+    def close(self):
+        """Stop the worker thread, dropping the chunks still queued for it."""
+        self.executor.shutdown(wait = False, cancel_futures = True)
+
+
+if __name__ == '__main__':
+    compiled = load_map()
+    rows, cols = compiled['boundary'].shape
+    cut_floor((-(cols * TILESIZE // 2), -(rows * TILESIZE // 2)), (cols * TILESIZE, rows * TILESIZE))
+    print(f'Floor cut into {CHUNK_SIZE}px tiles in {FLOOR_CHUNK_FOLDER}')
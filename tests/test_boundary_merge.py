@@ -0,0 +1,92 @@
+import random
+import numpy as np
+import pygame
+import pytest
+from settings import TILESIZE
+from entity import Entity
+from map_compiler import MAP_LAYERS, compile_layers, merge_rects
+from spatial_hash import ObstacleGroup
+from static_tiles import StaticTiles
+
+MAP_SIZE = 24
+WALKERS = 40
+STEPS = 120
+
+
+def boundary_mask(seed = 5):
+    """Walls, blocks and single cells, like the shipped boundary layer."""
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((MAP_SIZE, MAP_SIZE), dtype = bool)
+    mask[0, :] = mask[-1, :] = mask[:, 0] = mask[:, -1] = True
+    for _ in range(12):
+        row, col = rng.integers(1, MAP_SIZE - 4, size = 2)
+        height, width = rng.integers(1, 4, size = 2)
+        mask[row:row + height, col:col + width] = True
+    mask |= rng.random(mask.shape) < 0.05
+    return mask
+
+
+def boundary(source):
+    """(mask of boundary cells, merged rects) for a synthetic layout or the shipped map."""
+    if source == 'synthetic':
+        mask = boundary_mask()
+        return mask, merge_rects(mask)
+    # What the game loads from the shipped CSV layers
+    compiled = compile_layers(MAP_LAYERS)
+    return compiled['boundary'] == 395, compiled['boundary_rects']
+
+
+# The shipped mappington.tmx has an empty boundary layer, so it has nothing to merge
+MAPS = ['synthetic', 'shipped']
+
+
+@pytest.mark.parametrize('source', MAPS)
+def test_rects_cover_each_boundary_cell_once(source):
+    mask, rects = boundary(source)
+    covered = np.zeros(mask.shape, dtype = np.int32)
+    for col, row, width, height in rects:
+        covered[row:row + height, col:col + width] += 1
+    assert (covered == mask).all()
+    assert len(rects) < mask.sum()
+
+
+def world(rects):
+    tiles = StaticTiles()
+    obstacles = ObstacleGroup(tiles = tiles)
+    for col, row, width, height in rects:
+        tiles.add((int(col) * TILESIZE, int(row) * TILESIZE), [obstacles], 'invisible',
+                  size = (int(width) * TILESIZE, int(height) * TILESIZE))
+    return obstacles
+
+
+def walk(obstacles, shape, seed):
+    rng = random.Random(seed)
+    rows, cols = shape
+    walkers = []
+    while len(walkers) < WALKERS:
+        walker = Entity([])
+        walker.rect = pygame.Rect(rng.randrange(cols * TILESIZE), rng.randrange(rows * TILESIZE), TILESIZE * 2, TILESIZE * 2)
+        walker.hitbox = walker.rect.inflate(0, -26)
+        walker.obstacle_sprites = obstacles
+        # Start outside every obstacle, as the player and enemies do
+        if not obstacles.nearby(walker.hitbox, 0):
+            walkers.append(walker)
+
+    positions = []
+    for step in range(STEPS):
+        for walker in walkers:
+            if step % 20 == 0:
+                walker.direction = pygame.math.Vector2(rng.choice((-1, 0, 1)), rng.choice((-1, 0, 1)))
+            walker.move(rng.choice((2, 3, 5)))
+        positions.append([tuple(walker.hitbox) for walker in walkers])
+    return positions
+
+
+@pytest.mark.parametrize('source', MAPS)
+def test_merged_walls_collide_like_one_tile_per_cell(source):
+    mask, rects = boundary(source)
+    merged = world(rects)
+    rows, cols = np.nonzero(mask)
+    per_cell = world([(col, row, 1, 1) for row, col in zip(rows, cols)])
+    for seed in range(3):
+        assert walk(merged, mask.shape, seed) == walk(per_cell, mask.shape, seed)
@@ -0,0 +1,42 @@
+import pygame
+import pytest
+from settings import TILESIZE, WIDTH, HEIGHT
+from level import YSortCameraGroup
+from static_tiles import StaticTiles
+
+
+class Marker(pygame.sprite.Sprite):
+    def __init__(self, pos, groups):
+        super().__init__(groups)
+        self.image = pygame.Surface((TILESIZE, TILESIZE))
+        self.rect = self.image.get_rect(topleft = pos)
+
+
+@pytest.fixture
+def camera():
+    pygame.display.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    store = StaticTiles()
+    group = YSortCameraGroup(store)
+    surface = pygame.Surface((TILESIZE, TILESIZE))
+    for col in range(0, 60, 3):
+        store.add((col * TILESIZE, 0), [group], 'object', surface)
+    player = Marker((0, 0), [group])
+    # In front of a tile, so the baked path repaints its area
+    Marker((3 * TILESIZE, -10), [group])
+    Marker((50 * TILESIZE, 0), [group])
+    hidden = Marker((TILESIZE, 0), [group])
+    group.hide(hidden)
+    yield group, player
+    pygame.display.quit()
+
+
+@pytest.mark.parametrize('bake_static', [False, True])
+def test_counts_cover_each_shown_sprite_once(camera, bake_static):
+    group, player = camera
+    group.bake_static = bake_static
+    group.custom_draw(player)
+    # The view is the screen plus the cull margin around the player; two markers are in it
+    on_screen = sum(1 for col in range(0, 60, 3) if col * TILESIZE < WIDTH // 2 + 64) + 2
+    assert group.drawn_count == on_screen
+    assert group.culled_count == 20 + 3 - on_screen
@@ -0,0 +1,22 @@
+import pytest
+from spatial_hash import ObstacleGroup
+from bench_collision import LinearObstacleGroup, build_world
+
+MAP_SIZE = 24
+STEPS = 60
+
+
+def walk(group_class, use_store = False, seed = 3):
+    """Hitbox positions of the benchmark's walkers, step by step."""
+    _, walkers = build_world(MAP_SIZE, group_class, seed, use_store)
+    positions = []
+    for _ in range(STEPS):
+        for walker in walkers:
+            walker.move(3)
+        positions.append([walker.hitbox.topleft for walker in walkers])
+    return positions
+
+
+@pytest.mark.parametrize('use_store', [False, True])
+def test_indexed_collision_matches_a_linear_scan(use_store):
+    assert walk(ObstacleGroup, use_store) == walk(LinearObstacleGroup)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from csv_to_tmx import convert_batch, write_tmx, zstandard
+from tmx_loader import parse_tmx, local_ids
+
+LAYERS = ('objects', 'entities', 'boundary')
+ROWS = [
+    ['0', '5', '', '-1'],
+    ['395', '-1', '394', '11'],
+    [str(-0x80000000 + 3), '2'],
+]
+
+
+def original(rows):
+    """The CSV values as the loader should give them back: -1 for empty, short rows padded."""
+    width = max(len(row) for row in rows)
+    values = np.full((len(rows), width), -1, dtype = np.int64)
+    for row_index, row in enumerate(rows):
+        for col_index, cell in enumerate(row):
+            if cell.strip() not in ('', '-1'):
+                values[row_index, col_index] = int(cell)
+    return values
+
+
+def write_layers(folder, prefix = 'map'):
+    layers = {}
+    for name in LAYERS:
+        path = folder / f'{prefix}_{name if name != "boundary" else "boundary_blocks"}.csv'
+        path.write_text('\n'.join(','.join(row) for row in ROWS) + '\n')
+        layers[name] = str(path)
+    return layers
+
+
+def check_decodes(tmx_path):
+    parsed = parse_tmx(tmx_path)
+    assert parsed['tilesets'][0]['firstgid'] == 1
+    for name in LAYERS:
+        assert (local_ids(parsed['layers'][name], parsed['tilesets']) == original(ROWS)).all(), name
+
+
+ENCODINGS = [('csv', None), ('base64', None), ('base64', 'zlib'), ('base64', 'gzip')]
+if zstandard is not None:
+    ENCODINGS.append(('base64', 'zstd'))
+
+
+@pytest.mark.parametrize('encoding, compression', ENCODINGS)
+def test_streamed_layers_decode_to_csv_values(tmp_path, encoding, compression):
+    output = write_tmx(write_layers(tmp_path), str(tmp_path / 'map.tmx'), encoding, compression)
+    check_decodes(output)
+
+
+def test_batch_layers_decode_to_csv_values(tmp_path):
+    source = tmp_path / 'maps'
+    source.mkdir()
+    write_layers(source, 'first')
+    write_layers(source, 'second')
+    outputs = convert_batch([str(source)], str(tmp_path / 'out'), 'base64', 'zlib', workers = 2)
+    assert sorted(path.rsplit('/', 1)[-1] for path in outputs) == ['first.tmx', 'second.tmx']
+    for output in outputs:
+        check_decodes(output)
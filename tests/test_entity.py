@@ -0,0 +1,44 @@
+import pygame
+from settings import SIM_STEP, TILESIZE
+from entity import Entity
+from spatial_hash import ObstacleGroup
+from static_tiles import StaticTiles
+
+
+def walker(obstacles, pos = (0, 0)):
+    entity = Entity([])
+    entity.rect = pygame.Rect(pos, (TILESIZE, TILESIZE))
+    entity.hitbox = entity.rect.copy()
+    entity.obstacle_sprites = obstacles
+    entity.direction.update(1, 0)
+    return entity
+
+
+def test_steps_shorter_than_a_pixel_add_up():
+    entity = walker(ObstacleGroup())
+    for _ in range(8):
+        entity.move(1, SIM_STEP / 4)
+    assert entity.hitbox.topleft == (2, 0)
+    assert entity.rect.center == entity.hitbox.center
+
+
+def test_obstacles_stop_the_float_position_too():
+    store = StaticTiles()
+    obstacles = ObstacleGroup(tiles = store)
+    store.add((TILESIZE + 10, 0), [obstacles], 'invisible', size = (TILESIZE, TILESIZE))
+    entity = walker(obstacles)
+    for _ in range(20):
+        entity.move(1.5)
+    assert entity.hitbox.right == TILESIZE + 10
+    entity.direction.update(-1, 0)
+    entity.move(1.25)
+    # Backing off starts from the wall, not from where the blocked steps would have been
+    assert entity.hitbox.right == TILESIZE + 9
+
+
+def test_hitbox_placed_from_outside_is_followed():
+    entity = walker(ObstacleGroup())
+    entity.move(0.75)
+    entity.hitbox.topleft = (100, 100)
+    entity.move(0.75)
+    assert entity.hitbox.topleft == (101, 100)
@@ -0,0 +1,46 @@
+import pygame
+from settings import CHUNK_SIZE
+from world_streamer import blit_tiled, chunk_range, cut_floor, floor_chunk_path
+
+
+def pattern(width, height):
+    image = pygame.Surface((width, height))
+    for x in range(width):
+        for y in range(height):
+            image.set_at((x, y), (x * 10, y * 10, 100))
+    return image
+
+
+def test_floor_repeats_over_the_area_and_stops_at_its_edge():
+    image = pattern(3, 2)
+    area = pygame.Rect(-4, 5, 7, 5)
+    surface = pygame.Surface((12, 12))
+    surface.fill('black')
+    origin = (-6, 2)
+    blit_tiled(surface, image, area, origin)
+    for x in range(12):
+        for y in range(12):
+            world = (x + origin[0], y + origin[1])
+            if area.collidepoint(world):
+                expected = image.get_at(((world[0] - area.x) % 3, (world[1] - area.y) % 2))
+            else:
+                expected = pygame.Color('black')
+            assert surface.get_at((x, y)) == expected
+
+
+def test_cut_floor_covers_a_map_larger_than_the_image(tmp_path):
+    image = pattern(20, 20)
+    floor_path = str(tmp_path / 'floor.png')
+    pygame.image.save(image, floor_path)
+    area = pygame.Rect(-CHUNK_SIZE // 2, 0, CHUNK_SIZE // 2 + CHUNK_SIZE + 40, 60)
+    cut_floor(area.topleft, area.size, floor_path, str(tmp_path / 'chunks'))
+
+    left, top, right, bottom = chunk_range(area)
+    assert (left, right, top, bottom) == (-1, 1, 0, 0)
+    last = pygame.image.load(floor_chunk_path(str(tmp_path / 'chunks'), (1, 0)))
+    # World x = CHUNK_SIZE + 10 is inside the area, one chunk on
+    inside = (10, 30)
+    world_x = CHUNK_SIZE + inside[0]
+    assert last.get_at(inside) == image.get_at(((world_x - area.x) % 20, inside[1] % 20))
+    assert last.get_at((40, 30)) == pygame.Color('black')
+    assert last.get_at((10, 60)) == pygame.Color('black')
@@ -0,0 +1,57 @@
+import numpy as np
+import pygame
+import pytest
+from settings import TILESIZE, enemy_data
+from entity import Entity
+from flow_field import FlowField, clearance
+from spatial_hash import ObstacleGroup
+from static_tiles import StaticTiles
+
+
+def wall_world(size, wall_col, wall_end):
+    """An open map of size (cols, rows) with a wall down wall_col from the top edge to row wall_end."""
+    store = StaticTiles()
+    obstacles = ObstacleGroup(tiles = store)
+    for row in range(wall_end):
+        store.add((wall_col * TILESIZE, row * TILESIZE), [obstacles], 'invisible', size = (TILESIZE, TILESIZE))
+    return obstacles
+
+
+def chaser(obstacles, hitbox_size, center):
+    entity = Entity([])
+    entity.hitbox = pygame.Rect((0, 0), hitbox_size)
+    entity.hitbox.center = center
+    entity.rect = entity.hitbox.copy()
+    entity.obstacle_sprites = obstacles
+    return entity
+
+
+def test_clearance_covers_the_hitbox_from_anywhere_in_its_tile():
+    assert clearance((1, 1)) == (0, 0, 0, 0)
+    assert clearance((64, 54)) == (1, 1, 1, 1)
+    assert clearance((240, 230)) == (4, 4, 4, 4)
+
+
+@pytest.mark.parametrize('monster, hitbox_size, size, wall_end', [
+    ('squid', (64, 54), (24, 24), 16),
+    ('raccoon', (240, 230), (40, 40), 24),
+])
+def test_enemy_reaches_the_player_around_the_end_of_a_wall(monster, hitbox_size, size, wall_end):
+    wall_col = size[0] // 2
+    obstacles = wall_world(size, wall_col, wall_end)
+    flow_field = FlowField(obstacles, (size[1], size[0]), (0, 0), radius = max(size))
+    # Level with each other, on either side of the wall and well above its end
+    target = pygame.math.Vector2((wall_col + 6.5) * TILESIZE, 6.5 * TILESIZE)
+    enemy = chaser(obstacles, hitbox_size, ((wall_col - 6.5) * TILESIZE, target.y))
+    speed = enemy_data[monster]['speed']
+    attack_radius = enemy_data[monster]['attack_radius']
+
+    for _ in range(3000):
+        offset = target - enemy.hitbox.center
+        if offset.length() <= attack_radius:
+            break
+        flow_field.update(target)
+        steps, valid = flow_field.lookup(np.array([enemy.hitbox.center], dtype = float), np.array([hitbox_size]))
+        enemy.direction.update(*steps[0]) if valid[0] else enemy.direction.update(offset.normalize())
+        enemy.move(speed)
+    assert (target - enemy.hitbox.center).length() <= attack_radius
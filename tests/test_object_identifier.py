@@ -0,0 +1,14 @@
+import pytest
+from object_identifier import ObjectIdentifier
+from bench_object_identifier import random_layout, scan_cells
+
+MAP_SIZE = 32
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_find_objects_matches_the_per_cell_scan(seed):
+    identifier = ObjectIdentifier()
+    layout = random_layout(MAP_SIZE, identifier, seed)
+    scanned = scan_cells(identifier, layout.astype(str).tolist())
+    assert scanned
+    assert [tuple(match) for match in identifier.find_objects(layout).tolist()] == scanned
@@ -0,0 +1,44 @@
+import pygame
+import pytest
+from settings import WIDTH, HEIGHT
+from input_source import ScriptedKeys
+from player import Player
+from spatial_hash import ObstacleGroup
+
+
+class SteppedInput:
+    """A clock that starts at start and advances 16 ms a step, holding the given keys."""
+    def __init__(self, pressed, start = 0):
+        self.pressed = pressed
+        self.keys = ScriptedKeys()
+        self.ticks = start
+
+    def step(self):
+        self.keys = ScriptedKeys(self.pressed)
+        self.ticks += 16
+
+
+@pytest.fixture(autouse = True)
+def display():
+    pygame.display.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    yield
+    pygame.display.quit()
+
+
+@pytest.mark.parametrize('start', [-16, 5000])
+def test_first_step_attack_is_not_on_cooldown(start):
+    attacks = []
+    input_source = SteppedInput([pygame.K_SPACE], start)
+    player = Player((0, 0), [], ObstacleGroup(), lambda: attacks.append(input_source.ticks), lambda: None,
+                    lambda *args: None, input_source)
+    for _ in range(30):
+        input_source.step()
+        player.update()
+    # The first step, then once every 400 ms cooldown
+    assert attacks == [start + 16, start + 16 + 400]
+
+
+def test_player_needs_an_input_source():
+    with pytest.raises(TypeError):
+        Player((0, 0), [], ObstacleGroup(), lambda: None, lambda: None, lambda *args: None)
@@ -0,0 +1,23 @@
+import csv
+import json
+from profiler import Profiler
+
+
+def test_marks_made_while_disabled_are_exported(tmp_path):
+    profiler = Profiler(enabled = False)
+    profiler.mark('first_frame', 0.25)
+    profiler.enabled = True
+    for _ in range(3):
+        with profiler.section('update'):
+            pass
+        profiler.end_frame()
+
+    profiler.export_json(tmp_path / 'profile.json')
+    with open(tmp_path / 'profile.json') as export_file:
+        assert json.load(export_file)['marks_ms'] == {'first_frame': 250.0}
+
+    profiler.export_csv(tmp_path / 'profile.csv')
+    with open(tmp_path / 'profile.csv', newline = '') as export_file:
+        rows = list(csv.DictReader(export_file))
+    assert len(rows) == 3
+    assert {row['first_frame_ms'] for row in rows} == {'250.0000'}
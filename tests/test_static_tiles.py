@@ -0,0 +1,54 @@
+import random
+import pygame
+from settings import TILESIZE
+from bench_static_tiles import build_sprites, build_store, layout
+
+MAP_SIZE = 16
+
+
+def build(use_store):
+    # Taller than a tile, so rects and hitboxes do not line up with the grid
+    surface = pygame.Surface((TILESIZE, TILESIZE + 16))
+    visible, obstacles = (build_store if use_store else build_sprites)(layout(MAP_SIZE, 1), surface)
+    return visible.tiles, visible, obstacles
+
+
+def probes():
+    rng = random.Random(2)
+    return [pygame.Rect(rng.randrange(-64, MAP_SIZE * TILESIZE), rng.randrange(-64, MAP_SIZE * TILESIZE),
+                        rng.randrange(1, 200), rng.randrange(1, 200)) for _ in range(300)]
+
+
+def test_store_queries_match_tile_sprites():
+    _, sprite_visible, sprite_obstacles = build(False)
+    _, store_visible, store_obstacles = build(True)
+    for probe in probes():
+        assert ([tuple(hitbox) for hitbox in store_obstacles.nearby_hitboxes(probe)]
+                == [tuple(sprite.hitbox) for sprite in sprite_obstacles.nearby(probe)])
+        assert ([(tuple(tile.rect), tile.sprite_type) for tile in store_visible.query(probe)]
+                == [(tuple(sprite.rect), sprite.sprite_type) for sprite in sprite_visible.query(probe)])
+
+
+def test_killed_tiles_leave_the_groups_and_their_slots_are_reused():
+    store, visible, obstacles = build(True)
+    tiles = store.views(visible)
+    count = visible.tile_count()
+    victim = tiles[0]
+    rect = victim.rect
+    victim.kill()
+    assert not victim.alive()
+    assert visible.tile_count() == count - 1
+    assert victim not in visible.query(rect)
+
+    replacement = store.add(rect.topleft, [visible], 'grass', tiles[1].image)
+    assert replacement.index == victim.index
+    assert replacement.alive() and not victim.alive()
+    # A stale view must not remove the tile now in its slot
+    victim.kill()
+    assert replacement.alive()
+
+
+def test_tiles_are_not_sprites():
+    store, visible, obstacles = build(True)
+    assert obstacles.tile_count() > 0
+    assert len(obstacles) == 0 and not obstacles and list(obstacles) == []
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from csv_to_tmx import find_maps, write_tmx
+from map_compiler import MAP_LAYERS, SPAWN_TYPES, compile_map
+from tmx_loader import compile_tmx, load_tmx
+
+
+def test_exported_map_compiles_like_the_csvs(tmp_path):
+    expected = compile_map(MAP_LAYERS, str(tmp_path / 'csv.compiled.npz'))
+    layers = find_maps('./graphics/TileMap')['mappington']
+    compiled = compile_tmx(write_tmx(layers, str(tmp_path / 'mappington.tmx'), 'base64', 'zlib'))
+    for name, array in expected.items():
+        if name != 'source_hash':
+            assert np.array_equal(compiled[name], array), name
+
+
+def test_exported_spawns_keep_their_types(tmp_path):
+    entities = tmp_path / 'map_entities.csv'
+    entities.write_text('394,390,391\n392,393,7\n-1,,394\n')
+    empty = tmp_path / 'map_empty.csv'
+    empty.write_text('-1,-1,-1\n' * 3)
+    layers = {'details': str(empty), 'entities': str(entities), 'objects': str(empty), 'boundary': str(empty)}
+    compiled = compile_tmx(write_tmx(layers, str(tmp_path / 'map.tmx')))
+    spawns = [(int(col), int(row), SPAWN_TYPES[spawn_type]) for col, row, spawn_type in compiled['spawns']]
+    assert spawns == [
+        (0, 0, 'player'), (1, 0, 'bamboo'), (2, 0, 'spirit'),
+        (0, 1, 'raccoon'), (1, 1, 'squid'), (2, 1, 'squid'),
+        (2, 2, 'player'),
+    ]
+
+
+def test_missing_layer_is_an_error(tmp_path):
+    empty = tmp_path / 'map_empty.csv'
+    empty.write_text('-1,-1\n')
+    layers = {'details': str(empty), 'entities': str(empty), 'objects': str(empty)}
+    with pytest.raises(ValueError, match = 'boundary_blocks or boundary'):
+        compile_tmx(write_tmx(layers, str(tmp_path / 'map.tmx')))
+
+
+def test_tmx_cache_does_not_share_the_csv_cache_name(tmp_path):
+    layers = find_maps('./graphics/TileMap')['mappington']
+    tmx_path = write_tmx(layers, str(tmp_path / 'mappington.tmx'))
+    load_tmx(tmx_path)
+    assert (tmp_path / 'mappington.tmx.compiled.npz').exists()
+    assert not (tmp_path / 'mappington.compiled.npz').exists()